@@ -1,14 +1,30 @@
-from flask import Flask, request, send_file, jsonify
+from flask import Flask, Request, request, send_file, jsonify, stream_with_context
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 import pdfplumber
-from docx import Document
-from docx.shared import Pt, Inches
-from docx.enum.text import WD_ALIGN_PARAGRAPH
 import io
+import atexit
+import bisect
+import contextlib
+import copy
+import functools
 import os
 import re
+import time
+import hashlib
+import hmac
+import sqlite3
+import tempfile
+import threading
+import uuid
+import mmap
+import multiprocessing
+import pickle
+import queue
+import shutil
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from dotenv import load_dotenv
-import anthropic
 from rapidfuzz import fuzz, process
 
 # Load environment variables from .env file
@@ -17,18 +33,183 @@ load_dotenv()
 app = Flask(__name__, static_folder='static')
 CORS(app)
 
-# Initialize Anthropic client (will be None if API key not set)
+# Anthropic client, created by get_anthropic_client on first use: importing
+# anthropic and setting up its HTTP transport takes longer than the rest of
+# a worker's startup, and workers that never summarise don't need it
 anthropic_client = None
-if os.getenv('ANTHROPIC_API_KEY'):
-    anthropic_client = anthropic.Anthropic()
+
+# 'fake' swaps in fake_anthropic.FakeAnthropic, which writes summaries
+# locally, so summaries and their streaming work offline without an API key
+SUMMARY_CLIENT = os.getenv('SUMMARY_CLIENT', 'anthropic')
+
+# Domain summaries run in parallel; these bound how many Claude calls a
+# worker process makes at once and how long a conversion waits for them
+SUMMARY_CONCURRENCY = int(os.getenv('SUMMARY_CONCURRENCY', '4'))
+SUMMARY_TIMEOUT = float(os.getenv('SUMMARY_TIMEOUT', '60'))
+
+# Guards the lazy creation of the worker pools used across the app
+executor_lock = threading.Lock()
+
+
+def get_anthropic_client():
+    """Return the shared Anthropic client, or None if ANTHROPIC_API_KEY is not set.
+
+    With SUMMARY_CLIENT=fake this is the offline fake client instead.
+    """
+    global anthropic_client
+
+    if anthropic_client is None and (SUMMARY_CLIENT == 'fake' or os.getenv('ANTHROPIC_API_KEY')):
+        with executor_lock:
+            if anthropic_client is None:
+                if SUMMARY_CLIENT == 'fake':
+                    from fake_anthropic import FakeAnthropic
+                    anthropic_client = FakeAnthropic()
+                else:
+                    import anthropic
+                    anthropic_client = anthropic.Anthropic()
+    return anthropic_client
+
+# Created on first use so workers without summaries never start threads
+summary_executor = None
+
+# Stage timings and counters for /metrics (Prometheus text format) and the
+# Server-Timing header of /convert. Every worker process keeps its own.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+
+# Upper bounds of the histogram buckets, in seconds
+METRIC_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+METRIC_TYPES = {
+    'bdi3_stage_seconds': ('histogram', 'Time spent in each conversion stage.'),
+    'bdi3_page_step_seconds': ('histogram', 'Time spent on one page, by PDF backend and step (classify, columns, table, text).'),
+    'bdi3_pages_total': ('counter', 'Pages scanned, by PDF backend and extraction strategy.'),
+    'bdi3_documents_total': ('counter', 'Documents parsed, by the PDF backend whose rows were used.'),
+    'bdi3_skill_matches_total': ('counter', 'Skills matched, by match type.'),
+    'bdi3_llm_request_seconds': ('histogram', 'Latency of AI summary requests, by outcome.'),
+    'bdi3_llm_first_token_seconds': ('histogram', 'Time to the first text of streamed AI summaries.'),
+    'bdi3_llm_tokens_total': ('counter', 'Tokens used by AI summary requests, by direction.'),
+    'bdi3_llm_timeouts_total': ('counter', 'AI summaries abandoned after SUMMARY_TIMEOUT.'),
+    'bdi3_summary_cache_requests_total': ('counter', 'Summary cache lookups, by result.'),
+    'bdi3_summary_cache_entries': ('gauge', 'Entries in the shared summary cache.'),
+    'bdi3_result_cache_requests_total': ('counter', 'Result cache lookups, by result.'),
+    'bdi3_result_cache_entries': ('gauge', 'Entries in the shared result cache.'),
+    'bdi3_result_cache_bytes': ('gauge', 'Size of the payloads in the shared result cache.'),
+    'bdi3_admission_in_flight': ('gauge', 'Conversions holding an admission slot, by gate.'),
+    'bdi3_admission_queued': ('gauge', 'Conversions waiting for an admission slot, by gate.'),
+    'bdi3_admission_rejections_total': ('counter', 'Conversions turned away with a 503, by gate and reason.'),
+}
+
+metrics_lock = threading.Lock()
+# (name, labels) -> per-bucket counts (the last one is +Inf) and sum
+metric_histograms = {}
+# (name, labels) -> value
+metric_counters = {}
+
+
+def observe(name, seconds, **labels):
+    """Record one duration in a histogram."""
+    if not METRICS_ENABLED:
+        return
+
+    key = (name, tuple(sorted(labels.items())))
+    bucket = bisect.bisect_left(METRIC_BUCKETS, seconds)
+    with metrics_lock:
+        histogram = metric_histograms.get(key)
+        if histogram is None:
+            histogram = metric_histograms[key] = {'counts': [0] * (len(METRIC_BUCKETS) + 1), 'sum': 0.0}
+        histogram['counts'][bucket] += 1
+        histogram['sum'] += seconds
+
+
+def increment(name, amount=1, **labels):
+    """Add to a counter."""
+    if not METRICS_ENABLED or not amount:
+        return
+
+    key = (name, tuple(sorted(labels.items())))
+    with metrics_lock:
+        metric_counters[key] = metric_counters.get(key, 0) + amount
+
+
+@contextlib.contextmanager
+def timed(stage, timings=None):
+    """Time a block as one conversion stage.
+
+    The duration is added to the stage histogram and, if a timings dict is
+    given, to timings[stage] for the request's Server-Timing header.
+    """
+    if not METRICS_ENABLED:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start, timings)
+
+
+def record_stage(stage, elapsed, timings=None):
+    """Record a stage duration measured outside timed, like timed does."""
+    if not METRICS_ENABLED:
+        return
+
+    observe('bdi3_stage_seconds', elapsed, stage=stage)
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def server_timing_header(timings):
+    """Format stage timings, in seconds, as a Server-Timing header value."""
+    return ', '.join(f'{stage};dur={elapsed * 1000:.1f}' for stage, elapsed in timings.items())
+
+
+def format_metric_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(f'{name}="{value}"' for name, value in labels)
+    return '{' + pairs + '}'
+
 
 # Load BDI-3 skills mapping from JSON file
 import json
 
+SKILLS_JSON_PATH = os.path.join(os.path.dirname(__file__), 'bdi3_skills.json')
+
+# One number of an age string, with its unit if it has one: "2 yrs", "11mths"
+AGE_TERM_RE = re.compile(r'(\d+)\s*(y(?:ea)?rs?|m(?:on)?ths?)?', re.IGNORECASE)
+
+
+def parse_age_range(age):
+    """Parse an age string such as "(18mths- 2 yrs, 11mths)" into months.
+
+    Returns (min_months, max_months), or None for a blank or unrecognised
+    age. A number without a unit takes the next unit ("2-3 yrs"), and an
+    age in whole years runs to the end of that year, so "(2 yrs)" is
+    (24, 35).
+    """
+    bounds = [AGE_TERM_RE.findall(part) for part in age.strip('() ').split('-')]
+    if not 1 <= len(bounds) <= 2 or not all(bounds):
+        return None
+
+    unit = None
+    months = []
+    for terms in reversed(bounds):
+        total = 0
+        for number, term_unit in reversed(terms):
+            unit = term_unit.lower() or unit
+            if unit is None:
+                return None
+            total += int(number) * (12 if unit.startswith('y') else 1)
+        months.append(total)
+
+    last_unit = bounds[-1][-1][1].lower() or 'm'
+    return months[-1], months[0] + (11 if last_unit.startswith('y') else 0)
+
+
 def load_skills_mapping():
     """Load the BDI-3 skills mapping from JSON file and flatten it for lookups."""
-    json_path = os.path.join(os.path.dirname(__file__), 'bdi3_skills.json')
-    with open(json_path, 'r') as f:
+    with open(SKILLS_JSON_PATH, 'r') as f:
         skills_data = json.load(f)
 
     # Create flat mapping for age lookups
@@ -41,16 +222,63 @@ def load_skills_mapping():
             for skill, age in skills.items():
                 flat_map[skill] = {
                     'age': age,
+                    'age_months': parse_age_range(age),
                     'domain': domain,
                     'subdomain': subdomain
                 }
 
-    return flat_map, structured_map
+    return flat_map, structured_map, build_skill_index(flat_map)
+
+
+@functools.lru_cache(maxsize=1024)
+def skill_pool_key(name):
+    """Normalize a domain/subdomain name so PDF and JSON spellings agree.
+
+    The JSON uses "Attention & Memory" while the PDF parser produces
+    "Attention and Memory".
+    """
+    return ' '.join(name.replace('&', 'and').split()).casefold()
+
 
-SKILL_AGE_MAP, SKILLS_STRUCTURED = load_skills_mapping()
+def build_skill_index(flat_map):
+    """Precompute the lookup structures used by find_age_range.
+
+    - 'exact': case-folded, normalized skill text -> reference skill
+    - 'all': (choices, skills) over the whole table for fuzzy matching
+    - 'domains' / 'subdomains': the same pools restricted to one domain or
+      one (domain, subdomain) pair, so fuzzy matching can search the
+      skills the row actually belongs to first
+    """
+    exact = {}
+    pools = {}
 
-# Track unmatched skills for debugging
-unmatched_skills = []
+    def add_to_pool(key, choice, skill):
+        choices, skills = pools.setdefault(key, ([], []))
+        choices.append(choice)
+        skills.append(skill)
+
+    for skill, data in flat_map.items():
+        choice = normalize_skill_text(skill)
+        # First entry wins on collisions, like the old linear scan did
+        exact.setdefault(choice.casefold(), skill)
+
+        domain_key = skill_pool_key(data['domain'])
+        add_to_pool(None, choice, skill)
+        add_to_pool(domain_key, choice, skill)
+        add_to_pool((domain_key, skill_pool_key(data['subdomain'])), choice, skill)
+
+    pools = {key: (tuple(choices), tuple(skills)) for key, (choices, skills) in pools.items()}
+
+    return {
+        'exact': exact,
+        'all': pools.pop(None),
+        'domains': {key: pool for key, pool in pools.items() if isinstance(key, str)},
+        'subdomains': {key: pool for key, pool in pools.items() if isinstance(key, tuple)},
+    }
+
+
+# Minimum fuzz.ratio score for a fuzzy match
+FUZZY_MATCH_THRESHOLD = 85
 
 
 def normalize_skill_text(text):
@@ -59,70 +287,690 @@ def normalize_skill_text(text):
     text = ' '.join(text.split())
 
     # Normalize gendered pronouns to inclusive form (matches JSON)
-    text = text.replace('his or her', 'their')
-    text = text.replace('him or her', 'them')
-    text = text.replace('himself or herself', 'themselves')
-    text = text.replace('he or she', 'they')
+    if ' or ' in text:
+        text = text.replace('his or her', 'their')
+        text = text.replace('him or her', 'them')
+        text = text.replace('himself or herself', 'themselves')
+        text = text.replace('he or she', 'they')
 
     return text.strip().rstrip('.')
 
 
-def find_age_range(skill_text, track_unmatched=True):
+# Prebuilt copy of the skills tables and match index, so workers don't
+# rebuild them from the JSON. It is rebuilt when bdi3_skills.json changes;
+# set SKILLS_INDEX_PATH to an empty string to always build from the JSON.
+SKILLS_INDEX_PATH = os.getenv('SKILLS_INDEX_PATH',
+                              os.path.join(os.path.dirname(__file__), 'bdi3_skills.index'))
+
+# Bump when the structures built by load_skills_mapping change shape
+SKILLS_INDEX_VERSION = 3
+
+
+def load_skill_tables():
+    """Return load_skills_mapping's tables plus the JSON's SHA-256 fingerprint.
+
+    The tables come from SKILLS_INDEX_PATH when it was built from the
+    current JSON: a matching modification time and size are trusted, and
+    otherwise the JSON's hash must match. A missing or stale index is
+    rebuilt and saved.
+    """
+    source = os.stat(SKILLS_JSON_PATH)
+    stamp = (SKILLS_INDEX_VERSION, source.st_mtime_ns, source.st_size)
+
+    artifact = None
+    if SKILLS_INDEX_PATH:
+        try:
+            with open(SKILLS_INDEX_PATH, 'rb') as f:
+                artifact = pickle.load(f)
+            if artifact['version'] != SKILLS_INDEX_VERSION:
+                artifact = None
+        except Exception:
+            # Missing, unreadable or from an incompatible version: rebuild it
+            artifact = None
+
+    if artifact is not None and artifact['stamp'] == stamp:
+        return (*artifact['tables'], artifact['fingerprint'])
+
+    with open(SKILLS_JSON_PATH, 'rb') as f:
+        fingerprint = hashlib.sha256(f.read()).hexdigest()
+
+    if artifact is not None and artifact['fingerprint'] == fingerprint:
+        # Same content with a new timestamp, e.g. after a fresh checkout
+        tables = artifact['tables']
+    else:
+        tables = load_skills_mapping()
+
+    if SKILLS_INDEX_PATH:
+        artifact = {'version': SKILLS_INDEX_VERSION, 'stamp': stamp,
+                    'fingerprint': fingerprint, 'tables': tables}
+        try:
+            # Written under a temporary name so workers starting at the same
+            # time never read a partial file
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(SKILLS_INDEX_PATH) or '.')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.chmod(temp_path, 0o644)
+                os.replace(temp_path, SKILLS_INDEX_PATH)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+        except OSError as e:
+            print(f"Could not save skills index: {e}")
+
+    return (*tables, fingerprint)
+
+
+# SKILLS_FINGERPRINT identifies the loaded skills table; cached results built
+# from a different version of bdi3_skills.json are never reused
+SKILL_AGE_MAP, SKILLS_STRUCTURED, SKILL_INDEX, SKILLS_FINGERPRINT = load_skill_tables()
+
+@functools.lru_cache(maxsize=4096)
+def lookup_skill_text(text):
+    """Return (normalized text, exact reference skill or None) for a skill as extracted.
+
+    Reports word their skills like the reference table, so the same texts
+    come back in every report and are normalized once per process.
+    """
+    skill_clean = normalize_skill_text(text)
+    return skill_clean, SKILL_INDEX['exact'].get(skill_clean.casefold())
+
+
+# Age string -> (min_months, max_months), for skills matched outside match_skills
+AGE_RANGES = {entry['age']: entry['age_months'] for entry in SKILL_AGE_MAP.values()}
+
+
+def candidate_pools(domain=None, subdomain=None):
+    """Yield the fuzzy-match pools to search, narrowest first."""
+    if domain:
+        domain_key = skill_pool_key(domain)
+        pool = None
+        if subdomain:
+            pool = SKILL_INDEX['subdomains'].get((domain_key, skill_pool_key(subdomain)))
+        if pool is None:
+            pool = SKILL_INDEX['domains'].get(domain_key)
+        if pool is not None:
+            yield pool
+    yield SKILL_INDEX['all']
+
+
+# Learned skill aliases shared by all worker processes on this machine.
+# A skill text that needed fuzzy matching is stored with the reference skill
+# it matched, so the same wording in later reports is an exact lookup; an
+# admin can accept, correct or reject these and resolve unmatched skills
+# through /aliases. Set ALIAS_DB_PATH to an empty string to disable it.
+ALIAS_DB_PATH = os.getenv('ALIAS_DB_PATH', os.path.join(tempfile.gettempdir(), 'bdi3_aliases.sqlite3'))
+
+# Token required by the /aliases review endpoints; they are disabled without one
+ALIAS_ADMIN_TOKEN = os.getenv('ALIAS_ADMIN_TOKEN', '')
+
+# Seconds a worker uses its copy of the aliases before reloading them, so
+# reviews made through another worker are picked up
+ALIAS_REFRESH_INTERVAL = 30
+
+# status: 'learned' (from a fuzzy match), 'accepted' or 'rejected' (reviewed)
+ALIAS_STATUSES = ('learned', 'accepted', 'rejected')
+
+# New aliases and unmatched skill counts are gathered in each process and
+# written at most every ALIAS_FLUSH_INTERVAL seconds, and at exit
+ALIAS_FLUSH_INTERVAL = 30
+
+# Learned aliases are dropped ALIAS_TTL seconds after they were learned (and
+# learned again by the next report that needs them), least recently learned
+# first past ALIAS_MAX_LEARNED; reviewed aliases are kept. Unmatched skills
+# not seen for UNMATCHED_TTL seconds are dropped, least recently seen first
+# past UNMATCHED_MAX_ENTRIES. 0 for no limit on the number.
+ALIAS_TTL = float(os.getenv('ALIAS_TTL', str(90 * 24 * 3600)))
+ALIAS_MAX_LEARNED = int(os.getenv('ALIAS_MAX_LEARNED', '20000'))
+UNMATCHED_TTL = float(os.getenv('UNMATCHED_TTL', str(30 * 24 * 3600)))
+UNMATCHED_MAX_ENTRIES = int(os.getenv('UNMATCHED_MAX_ENTRIES', '5000'))
+
+# This process's copy of the usable aliases: alias key -> reference skill, or
+# None for a rejected alias. revision changes whenever a review changes them.
+skill_aliases = {'aliases': {}, 'revision': '', 'loaded_at': float('-inf')}
+alias_lock = threading.Lock()
+
+# Match results not yet written to the alias store: alias key -> details as
+# taken by record_match_results, and for unmatched skills [*details, seen,
+# last_seen]
+pending_match_results = {'learned': {}, 'unmatched': {}, 'flushed_at': time.monotonic()}
+pending_match_results_lock = threading.Lock()
+
+
+def alias_key(skill_clean, domain=None, subdomain=None):
+    """Key an extracted skill by its text and the subdomain it was found in.
+
+    The subdomain is part of the key because fuzzy matching searches the
+    row's own subdomain first, so the same text can match differently
+    elsewhere.
+    """
+    return skill_clean.casefold(), skill_pool_key(domain or ''), skill_pool_key(subdomain or '')
+
+
+def open_alias_store():
+    """Open the alias database, creating it if needed."""
+    conn = sqlite3.connect(ALIAS_DB_PATH, timeout=5)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS aliases ('
+        ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+        ' text TEXT NOT NULL,'
+        ' domain_key TEXT NOT NULL,'
+        ' subdomain_key TEXT NOT NULL,'
+        ' extracted TEXT NOT NULL,'
+        ' domain TEXT,'
+        ' subdomain TEXT,'
+        ' skill TEXT NOT NULL,'
+        ' status TEXT NOT NULL,'
+        ' fingerprint TEXT NOT NULL,'
+        ' created_at REAL NOT NULL,'
+        ' updated_at REAL NOT NULL,'
+        ' UNIQUE (text, domain_key, subdomain_key))'
+    )
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS unmatched ('
+        ' text TEXT NOT NULL,'
+        ' domain_key TEXT NOT NULL,'
+        ' subdomain_key TEXT NOT NULL,'
+        ' extracted TEXT NOT NULL,'
+        ' domain TEXT,'
+        ' subdomain TEXT,'
+        ' seen INTEGER NOT NULL,'
+        ' last_seen REAL NOT NULL,'
+        ' PRIMARY KEY (text, domain_key, subdomain_key))'
+    )
+    return conn
+
+
+def get_skill_aliases():
+    """Return this process's alias map, reloading it when it is stale.
+
+    Learned aliases only count for the skills table they were learned
+    from, and aliases to skills no longer in the table are ignored.
+    """
+    if not ALIAS_DB_PATH:
+        return skill_aliases['aliases']
+    if time.monotonic() - skill_aliases['loaded_at'] < ALIAS_REFRESH_INTERVAL:
+        return skill_aliases['aliases']
+
+    with alias_lock:
+        if time.monotonic() - skill_aliases['loaded_at'] >= ALIAS_REFRESH_INTERVAL:
+            try:
+                conn = open_alias_store()
+                try:
+                    rows = conn.execute(
+                        'SELECT text, domain_key, subdomain_key, skill, status, fingerprint FROM aliases'
+                    ).fetchall()
+                    revision = conn.execute(
+                        "SELECT COUNT(*), MAX(updated_at) FROM aliases WHERE status != 'learned'"
+                    ).fetchone()
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                print(f"Alias store error: {e}")
+                rows, revision = None, None
+
+            if rows is not None:
+                aliases = {}
+                for text, domain_key, subdomain_key, skill, status, fingerprint in rows:
+                    if status == 'rejected':
+                        aliases[(text, domain_key, subdomain_key)] = None
+                    elif skill in SKILL_AGE_MAP and (status == 'accepted' or fingerprint == SKILLS_FINGERPRINT):
+                        aliases[(text, domain_key, subdomain_key)] = skill
+                skill_aliases['aliases'] = aliases
+                skill_aliases['revision'] = f'{revision[0]}:{revision[1]}'
+            # On errors the old copy is kept and retried after the interval
+            skill_aliases['loaded_at'] = time.monotonic()
+
+    return skill_aliases['aliases']
+
+
+def invalidate_skill_aliases():
+    """Make the next lookup reload the aliases."""
+    skill_aliases['loaded_at'] = float('-inf')
+
+
+def record_match_results(learned, unmatched):
+    """Store new fuzzy-match aliases and count unmatched skills.
+
+    Both map an alias key to (extracted text, domain, subdomain); learned
+    values carry the matched reference skill as a fourth item. New aliases
+    are used in this process straight away; both are written to the alias
+    store by flush_match_results once ALIAS_FLUSH_INTERVAL has passed.
+    """
+    if not ALIAS_DB_PATH or not (learned or unmatched):
+        return
+
+    if learned:
+        with alias_lock:
+            aliases = dict(skill_aliases['aliases'])
+            for key, details in learned.items():
+                aliases.setdefault(key, details[3])
+            skill_aliases['aliases'] = aliases
+
+    now = time.time()
+    with pending_match_results_lock:
+        pending_match_results['learned'].update(learned)
+        pending = pending_match_results['unmatched']
+        for key, details in unmatched.items():
+            if key in pending:
+                pending[key][3] += 1
+                pending[key][4] = now
+            else:
+                pending[key] = [*details, 1, now]
+        due = time.monotonic() - pending_match_results['flushed_at'] >= ALIAS_FLUSH_INTERVAL
+
+    if due:
+        flush_match_results()
+
+
+def flush_match_results():
+    """Write the pending match results to the alias store and prune it.
+
+    Learned aliases never overwrite reviewed ones, and skills with an
+    accepted alias are no longer counted as unmatched.
+    """
+    with pending_match_results_lock:
+        learned = pending_match_results['learned']
+        unmatched = pending_match_results['unmatched']
+        pending_match_results.update(learned={}, unmatched={}, flushed_at=time.monotonic())
+    if not ALIAS_DB_PATH or not (learned or unmatched):
+        return
+
+    now = time.time()
+    try:
+        conn = open_alias_store()
+        try:
+            with conn:
+                conn.executemany(
+                    'INSERT INTO aliases (text, domain_key, subdomain_key, extracted, domain, subdomain,'
+                    ' skill, status, fingerprint, created_at, updated_at)'
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, 'learned', ?, ?, ?)"
+                    ' ON CONFLICT (text, domain_key, subdomain_key) DO UPDATE SET'
+                    ' skill = excluded.skill, fingerprint = excluded.fingerprint, updated_at = excluded.updated_at'
+                    " WHERE status = 'learned'",
+                    [(*key, *details, SKILLS_FINGERPRINT, now, now) for key, details in learned.items()]
+                )
+                conn.executemany(
+                    'INSERT INTO unmatched (text, domain_key, subdomain_key, extracted, domain, subdomain,'
+                    ' seen, last_seen)'
+                    ' SELECT ?, ?, ?, ?, ?, ?, ?, ? WHERE NOT EXISTS ('
+                    "  SELECT 1 FROM aliases WHERE status = 'accepted'"
+                    '  AND text = ? AND domain_key = ? AND subdomain_key = ?)'
+                    ' ON CONFLICT (text, domain_key, subdomain_key) DO UPDATE SET'
+                    ' seen = seen + excluded.seen, last_seen = excluded.last_seen',
+                    [(*key, *details, *key) for key, details in unmatched.items()]
+                )
+                prune_alias_store(conn, now)
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Alias store error: {e}")
+
+
+def prune_alias_store(conn, now):
+    """Drop expired learned aliases and unmatched skills, then the oldest past the limits."""
+    conn.execute("DELETE FROM aliases WHERE status = 'learned' AND updated_at <= ?", (now - ALIAS_TTL,))
+    if ALIAS_MAX_LEARNED:
+        conn.execute(
+            'DELETE FROM aliases WHERE id IN ('
+            " SELECT id FROM aliases WHERE status = 'learned' ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (ALIAS_MAX_LEARNED,)
+        )
+    conn.execute('DELETE FROM unmatched WHERE last_seen <= ?', (now - UNMATCHED_TTL,))
+    if UNMATCHED_MAX_ENTRIES:
+        conn.execute(
+            'DELETE FROM unmatched WHERE rowid IN ('
+            ' SELECT rowid FROM unmatched ORDER BY last_seen DESC LIMIT -1 OFFSET ?)',
+            (UNMATCHED_MAX_ENTRIES,)
+        )
+
+
+# Results gathered since the last flush would otherwise be lost when a
+# worker exits
+atexit.register(flush_match_results)
+
+
+def new_match_context():
+    """Create the per-conversion record of matching results.
+
+    - 'unmatched_skills': skills with no match, as an ordered set (dict keys)
+    - 'page_strategies': the extraction strategy used for each parsed page
+
+    Each conversion gets its own context, so concurrent requests in one
+    process never see each other's results.
+    """
+    return {'unmatched_skills': {}, 'page_strategies': []}
+
+
+def find_age_range(skill_text, match_context=None, domain=None, subdomain=None):
     """Find age range for a skill using fuzzy matching.
 
+    When the domain/subdomain of the row is known, fuzzy matching searches
+    that subdomain's skills first and falls back to the whole table.
+    Fuzzy matches are saved as aliases. Unmatched skills are recorded in
+    match_context, if given, and counted in the alias store (see
+    record_match_results).
+
     Returns tuple: (age_range, match_type) where match_type is:
     - 'exact': Exact match found
+    - 'alias': Matched through a learned or reviewed alias
     - 'fuzzy': Fuzzy match (85%+ similarity)
     - 'none': No match found
     """
-    global unmatched_skills
-
-    # Clean and normalize the skill text
-    skill_clean = normalize_skill_text(skill_text)
+    # Clean and normalize the skill text, and try a case-insensitive exact match
+    skill_clean, ref_skill = lookup_skill_text(skill_text)
+    if ref_skill is not None:
+        return SKILL_AGE_MAP[ref_skill]['age'], 'exact'
+
+    key = alias_key(skill_clean, domain, subdomain)
+    aliases = get_skill_aliases()
+    if key in aliases:
+        ref_skill = aliases[key]
+        if ref_skill is not None:
+            return SKILL_AGE_MAP[ref_skill]['age'], 'alias'
+    else:
+        matched_skill = fuzzy_match(skill_clean, domain, subdomain)
+        if matched_skill is not None:
+            record_match_results({key: (skill_clean, domain, subdomain, matched_skill)}, {})
+            return SKILL_AGE_MAP[matched_skill]['age'], 'fuzzy'
 
-    # Try exact match first
-    if skill_clean in SKILL_AGE_MAP:
-        return SKILL_AGE_MAP[skill_clean]['age'], 'exact'
+    # No match found - track it for debugging
+    if match_context is not None:
+        match_context['unmatched_skills'].setdefault(skill_clean)
+    record_match_results({}, {key: (skill_clean, domain, subdomain)})
 
-    # Try case-insensitive exact match
-    skill_lower = skill_clean.lower()
-    for ref_skill, data in SKILL_AGE_MAP.items():
-        if ref_skill.lower() == skill_lower:
-            return data['age'], 'exact'
+    return "", 'none'
 
-    # Use fuzzy matching - find best match above 85% similarity
-    skill_list = list(SKILL_AGE_MAP.keys())
-    result = process.extractOne(skill_clean, skill_list, scorer=fuzz.ratio)
 
-    if result and result[1] >= 85:  # 85% similarity threshold
-        matched_skill = result[0]
-        return SKILL_AGE_MAP[matched_skill]['age'], 'fuzzy'
+def fuzzy_match(skill_clean, domain=None, subdomain=None):
+    """Return the reference skill most similar to skill_clean, or None.
 
-    # No match found - track it for debugging
-    if track_unmatched and skill_clean not in unmatched_skills:
-        unmatched_skills.append(skill_clean)
+    The row's candidate pools are searched narrowest first, and the first
+    match of at least FUZZY_MATCH_THRESHOLD wins.
+    """
+    for choices, skills in candidate_pools(domain, subdomain):
+        result = process.extractOne(skill_clean, choices, scorer=fuzz.ratio,
+                                    score_cutoff=FUZZY_MATCH_THRESHOLD)
+        if result:
+            return skills[result[2]]
+    return None
 
-    return "", 'none'
 
+def match_skills(rows, match_context=None):
+    """Fill in 'age', 'age_months' and 'match_type' for every skill of a document at once.
 
-def get_match_stats():
-    """Return statistics about skill matching."""
+    rows is a list of (domain, subdomain, skill_dict) in extraction order.
+    Every row gets the result find_age_range would give it, but each
+    distinct alias key is fuzzy matched once, and new aliases and
+    unmatched skills are recorded together.
+    """
+    aliases = get_skill_aliases()
+
+    # Alias key -> fuzzy-matched reference skill or None
+    fuzzy = {}
+
+    match_counts = {'exact': 0, 'alias': 0, 'fuzzy': 0, 'none': 0}
+    learned = {}
+    unmatched = {}
+    for domain, subdomain, skill_data in rows:
+        skill_clean, ref_skill = lookup_skill_text(skill_data['skill'])
+
+        match_type = 'exact'
+        if ref_skill is None:
+            key = alias_key(skill_clean, domain, subdomain)
+            if key in aliases:
+                ref_skill = aliases[key]
+                match_type = 'alias'
+            else:
+                if key not in fuzzy:
+                    fuzzy[key] = fuzzy_match(skill_clean, domain, subdomain)
+                ref_skill = fuzzy[key]
+                match_type = 'fuzzy'
+                if ref_skill is not None:
+                    learned[key] = (skill_clean, domain, subdomain, ref_skill)
+
+        if ref_skill is None:
+            match_type = 'none'
+            skill_data['age'] = ''
+            skill_data['age_months'] = None
+            # No match found - track it for debugging
+            if match_context is not None:
+                match_context['unmatched_skills'].setdefault(skill_clean)
+            unmatched[key] = (skill_clean, domain, subdomain)
+        else:
+            reference = SKILL_AGE_MAP[ref_skill]
+            skill_data['age'] = reference['age']
+            skill_data['age_months'] = reference['age_months']
+        skill_data['match_type'] = match_type
+        match_counts[match_type] += 1
+
+    for match_type, count in match_counts.items():
+        increment('bdi3_skill_matches_total', count, match_type=match_type)
+
+    record_match_results(learned, unmatched)
+
+
+def get_match_stats(match_context):
+    """Return statistics about skill matching for one conversion."""
+    unmatched_skills = list(match_context['unmatched_skills'])
     return {
         'total_skills_in_json': len(SKILL_AGE_MAP),
-        'unmatched_skills': unmatched_skills.copy(),
-        'unmatched_count': len(unmatched_skills)
+        'unmatched_skills': unmatched_skills,
+        'unmatched_count': len(unmatched_skills),
+        'page_strategies': list(match_context['page_strategies'])
     }
 
 
-def clear_unmatched_skills():
-    """Clear the unmatched skills list (call before each new PDF)."""
-    global unmatched_skills
-    unmatched_skills = []
+SUMMARY_MODEL = "claude-sonnet-4-20250514"
+
+# Domain-specific prompts - plain text only, no markdown
+SUMMARY_FORMAT_INSTRUCTIONS = """
+
+IMPORTANT: Write in plain text only. Do NOT use any markdown formatting like **bold**, *italics*, or bullet points. The text will be pasted directly into a Word document."""
+
+SUMMARY_PROMPTS = {
+    "Cognitive": """Create 3 paragraphs from this data by sorting skills into sentences for "mastered" and "emerging" for each Cognitive subdomain (Attention & Memory, Reasoning & Academic Skills, Perception & Concepts).
+
+Each paragraph should cover one subdomain. Start each paragraph with the subdomain name followed by a colon.
+{format_instructions}
+
+{data_section}""",
+
+    "Adaptive": """Create 2 paragraphs from this data by sorting skills into sentences for "mastered" and "emerging" for each Adaptive subdomain (Self Care, Personal Responsibility).
+
+Each paragraph should cover one subdomain. Start each paragraph with the subdomain name followed by a colon.
+{format_instructions}
+
+{data_section}""",
+
+    "Motor": """Create 3 paragraphs from this data by sorting skills into sentences for "mastered" and "emerging" for each Motor subdomain (Gross Motor, Fine Motor, Perceptual Motor).
+
+Each paragraph should cover one subdomain. Start each paragraph with the subdomain name followed by a colon.
+{format_instructions}
+
+{data_section}""",
+
+    "Social-Emotional": """Create paragraphs from this data by sorting skills into sentences for "mastered" and "emerging" for each Social-Emotional subdomain.
+
+Each paragraph should cover one subdomain. Start each paragraph with the subdomain name followed by a colon.
+{format_instructions}
+
+{data_section}"""
+}
+
+# Disk caches shared by all worker processes on this machine: one SQLite
+# table per cache, whose entries expire ttl seconds after they are stored.
+# Least recently used entries are evicted past max_entries entries or
+# max_bytes bytes (0 for no limit). An empty path disables a cache.
+cache_stats_lock = threading.Lock()
+
+# Columns of every cache table; a table with others was made by an older
+# version of the app and is dropped
+CACHE_COLUMNS = ['key', 'value', 'size', 'created_at', 'accessed_at']
+
+
+def new_disk_cache(name, table, path, ttl, max_entries=0, max_bytes=0):
+    return {'name': name, 'table': table, 'path': path, 'ttl': ttl,
+            'max_entries': max_entries, 'max_bytes': max_bytes,
+            'stats': {'hits': 0, 'misses': 0, 'errors': 0}}
+
+
+def open_cache(cache):
+    """Open a cache's database, creating its table if needed."""
+    table = cache['table']
+    conn = sqlite3.connect(cache['path'], timeout=5)
+    conn.execute('PRAGMA journal_mode=WAL')
+    if [row[1] for row in conn.execute(f'PRAGMA table_info({table})')] == CACHE_COLUMNS:
+        return conn
+
+    # Check again holding the write lock, so concurrent openers don't drop
+    # each other's new table
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        columns = [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+        if columns and columns != CACHE_COLUMNS:
+            conn.execute(f'DROP TABLE {table}')
+        conn.execute(
+            f'CREATE TABLE IF NOT EXISTS {table} ('
+            ' key TEXT PRIMARY KEY,'
+            ' value TEXT NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' created_at REAL NOT NULL,'
+            ' accessed_at REAL NOT NULL)'
+        )
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        conn.close()
+        raise
+    return conn
+
+
+def count_cache(stats, stat):
+    with cache_stats_lock:
+        stats[stat] += 1
+
+
+def cache_get(cache, key):
+    """Return a cached value, or None on a miss or expired entry."""
+    if not cache['path']:
+        return None
+
+    table = cache['table']
+    try:
+        conn = open_cache(cache)
+        try:
+            now = time.time()
+            with conn:
+                row = conn.execute(
+                    f'SELECT value FROM {table} WHERE key = ? AND created_at > ?',
+                    (key, now - cache['ttl'])
+                ).fetchone()
+                if row:
+                    conn.execute(f'UPDATE {table} SET accessed_at = ? WHERE key = ?', (now, key))
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"{cache['name'].capitalize()} cache error: {e}")
+        count_cache(cache['stats'], 'errors')
+        return None
+
+    count_cache(cache['stats'], 'hits' if row else 'misses')
+    return row[0] if row else None
+
+
+def cache_put(cache, key, value):
+    """Store a value, evicting expired and least recently used entries."""
+    size = len(value.encode('utf-8'))
+    if not cache['path'] or (cache['max_bytes'] and size > cache['max_bytes']):
+        return
+
+    table = cache['table']
+    try:
+        conn = open_cache(cache)
+        try:
+            now = time.time()
+            with conn:
+                conn.execute(
+                    f'INSERT OR REPLACE INTO {table} (key, value, size, created_at, accessed_at) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (key, value, size, now, now)
+                )
+                conn.execute(f'DELETE FROM {table} WHERE created_at <= ?', (now - cache['ttl'],))
+                if cache['max_entries']:
+                    conn.execute(
+                        f'DELETE FROM {table} WHERE key IN ('
+                        f' SELECT key FROM {table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                        (cache['max_entries'],)
+                    )
+                if cache['max_bytes']:
+                    conn.execute(
+                        f'DELETE FROM {table} WHERE key IN ('
+                        ' SELECT key FROM ('
+                        f'  SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC) AS total FROM {table}'
+                        ' ) WHERE total > ?)',
+                        (cache['max_bytes'],)
+                    )
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"{cache['name'].capitalize()} cache error: {e}")
+        count_cache(cache['stats'], 'errors')
+
+
+def get_cache_stats(cache):
+    """Return hit/miss counters for this process and the shared cache size."""
+    with cache_stats_lock:
+        stats = dict(cache['stats'])
+
+    stats['entries'] = 0
+    stats['bytes'] = 0
+    if cache['path']:
+        try:
+            conn = open_cache(cache)
+            try:
+                stats['entries'], stats['bytes'] = conn.execute(
+                    f'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {cache["table"]}').fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            pass
+    return stats
+
+
+# Persistent cache of domain summaries.
+# Set SUMMARY_CACHE_PATH to an empty string to disable it.
+SUMMARY_CACHE_PATH = os.getenv('SUMMARY_CACHE_PATH',
+                               os.path.join(tempfile.gettempdir(), 'bdi3_summary_cache.sqlite3'))
+SUMMARY_CACHE_TTL = float(os.getenv('SUMMARY_CACHE_TTL', str(30 * 24 * 3600)))
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv('SUMMARY_CACHE_MAX_ENTRIES', '5000'))
+
+summary_cache = new_disk_cache('summary', 'summaries', SUMMARY_CACHE_PATH, SUMMARY_CACHE_TTL,
+                               max_entries=SUMMARY_CACHE_MAX_ENTRIES)
+
+
+def summary_cache_key(domain_name, template, model, subdomain_info):
+    """Hash everything that determines a domain summary."""
+    skills = {
+        sub_name: {'mastered': sorted(info['mastered']), 'emerging': sorted(info['emerging'])}
+        for sub_name, info in subdomain_info.items()
+    }
+    payload = json.dumps([domain_name, template, model, skills], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
 
 
-def generate_domain_summary(domain_name, subdomains_data):
-    """Generate an AI summary for an entire domain with all its subdomains."""
-    if not anthropic_client:
+def generate_domain_summary(domain_name, subdomains_data, timeout=None, on_text=None):
+    """Generate an AI summary for an entire domain with all its subdomains.
+
+    Summaries are cached on disk, so a domain whose skills have not changed
+    never calls the API twice. With on_text, the summary is requested with
+    the streaming API and on_text(text) is called with each piece of text
+    as it arrives (a cached summary arrives in one piece); the complete
+    summary is still returned.
+    """
+    client = get_anthropic_client()
+    if not client:
         return None
 
     # Build data for each subdomain
@@ -138,6 +986,15 @@ def generate_domain_summary(domain_name, subdomains_data):
                 emerging.append(skill_text)
         subdomain_info[subdomain_name] = {'mastered': mastered, 'emerging': emerging}
 
+    template = SUMMARY_PROMPTS.get(domain_name, SUMMARY_PROMPTS["Social-Emotional"])
+
+    cache_key = summary_cache_key(domain_name, template, SUMMARY_MODEL, subdomain_info)
+    cached = cache_get(summary_cache, cache_key)
+    if cached is not None:
+        if on_text:
+            on_text(cached)
+        return cached
+
     # Build the data section
     data_section = ""
     for sub_name, info in subdomain_info.items():
@@ -147,118 +1004,1232 @@ def generate_domain_summary(domain_name, subdomains_data):
         if info['emerging']:
             data_section += f"EMERGING: {', '.join(info['emerging'])}\n"
 
-    # Domain-specific prompts - plain text only, no markdown
-    format_instructions = """
+    prompt = template.format(format_instructions=SUMMARY_FORMAT_INSTRUCTIONS,
+                             data_section=data_section)
+
+    request = {
+        'model': SUMMARY_MODEL,
+        'max_tokens': 800,
+        'timeout': timeout,
+        'messages': [
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+    }
 
-IMPORTANT: Write in plain text only. Do NOT use any markdown formatting like **bold**, *italics*, or bullet points. The text will be pasted directly into a Word document."""
+    start = time.perf_counter()
+    try:
+        if on_text:
+            first_text = True
+            with client.messages.stream(**request) as stream:
+                for text in stream.text_stream:
+                    if first_text:
+                        observe('bdi3_llm_first_token_seconds', time.perf_counter() - start)
+                        first_text = False
+                    on_text(text)
+                message = stream.get_final_message()
+        else:
+            message = client.messages.create(**request)
+        summary = message.content[0].text.strip()
+    except Exception as e:
+        observe('bdi3_llm_request_seconds', time.perf_counter() - start, outcome='error')
+        print(f"Error generating summary: {e}")
+        return None
 
-    prompts = {
-        "Cognitive": f"""Create 3 paragraphs from this data by sorting skills into sentences for "mastered" and "emerging" for each Cognitive subdomain (Attention & Memory, Reasoning & Academic Skills, Perception & Concepts).
+    observe('bdi3_llm_request_seconds', time.perf_counter() - start, outcome='ok')
+    increment('bdi3_llm_tokens_total', message.usage.input_tokens, direction='input')
+    increment('bdi3_llm_tokens_total', message.usage.output_tokens, direction='output')
 
-Each paragraph should cover one subdomain. Start each paragraph with the subdomain name followed by a colon.
-{format_instructions}
+    cache_put(summary_cache, cache_key, summary)
+    return summary
 
-{data_section}""",
 
-        "Adaptive": f"""Create 2 paragraphs from this data by sorting skills into sentences for "mastered" and "emerging" for each Adaptive subdomain (Self Care, Personal Responsibility).
+def start_domain_summaries(data, domain_names, on_text=None):
+    """Start AI summaries for several domains concurrently.
 
-Each paragraph should cover one subdomain. Start each paragraph with the subdomain name followed by a colon.
-{format_instructions}
+    All requests start together on a shared thread pool and share one
+    SUMMARY_TIMEOUT deadline. Returns the pending work for
+    collect_domain_summaries, or None when summaries are unavailable.
+    With on_text, summaries are streamed and on_text(domain_name, text) is
+    called from the pool's threads as their text arrives.
+    """
+    global summary_executor
 
-{data_section}""",
+    if not get_anthropic_client() or not domain_names:
+        return None
 
-        "Motor": f"""Create 3 paragraphs from this data by sorting skills into sentences for "mastered" and "emerging" for each Motor subdomain (Gross Motor, Fine Motor, Perceptual Motor).
+    if summary_executor is None:
+        with executor_lock:
+            if summary_executor is None:
+                summary_executor = ThreadPoolExecutor(max_workers=SUMMARY_CONCURRENCY,
+                                                      thread_name_prefix='summary')
 
-Each paragraph should cover one subdomain. Start each paragraph with the subdomain name followed by a colon.
-{format_instructions}
+    futures = {
+        domain_name: summary_executor.submit(
+            generate_domain_summary, domain_name, data[domain_name], SUMMARY_TIMEOUT,
+            functools.partial(on_text, domain_name) if on_text else None
+        )
+        for domain_name in domain_names
+    }
+    return futures, time.monotonic() + SUMMARY_TIMEOUT
 
-{data_section}""",
 
-        "Social-Emotional": f"""Create paragraphs from this data by sorting skills into sentences for "mastered" and "emerging" for each Social-Emotional subdomain.
+def collect_domain_summaries(pending, on_summary=None):
+    """Wait for summaries started by start_domain_summaries.
 
-Each paragraph should cover one subdomain. Start each paragraph with the subdomain name followed by a colon.
-{format_instructions}
+    Returns {domain_name: summary}; domains whose summary failed or timed
+    out are left out. on_summary(domain_name, summary) is called for each
+    summary as it is collected.
+    """
+    if pending is None:
+        return {}
 
-{data_section}"""
-    }
+    summaries = {}
+    for domain_name in pending[0]:
+        summary = wait_domain_summary(pending, domain_name)
+        if summary:
+            summaries[domain_name] = summary
+            if on_summary:
+                on_summary(domain_name, summary)
 
-    prompt = prompts.get(domain_name, prompts["Social-Emotional"])
+    return summaries
+
+
+def wait_domain_summary(pending, domain_name):
+    """Wait for one domain's summary; None if it failed, timed out or wasn't started."""
+    futures, deadline = pending
+    future = futures.get(domain_name)
+    if future is None:
+        return None
 
     try:
-        message = anthropic_client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=800,
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-        )
-        return message.content[0].text.strip()
+        return future.result(timeout=max(0, deadline - time.monotonic()))
     except Exception as e:
-        print(f"Error generating summary: {e}")
+        future.cancel()
+        if isinstance(e, TimeoutError):
+            increment('bdi3_llm_timeouts_total')
+        print(f"Error generating summary for {domain_name}: {e!r}")
         return None
 
 
+# Persistent cache of whole /convert responses, keyed by the uploaded bytes.
+# Set RESULT_CACHE_PATH to an empty string to disable it.
+RESULT_CACHE_PATH = os.getenv('RESULT_CACHE_PATH',
+                              os.path.join(tempfile.gettempdir(), 'bdi3_result_cache.sqlite3'))
+RESULT_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+RESULT_CACHE_TTL = float(os.getenv('RESULT_CACHE_TTL', str(7 * 24 * 3600)))
+
+# Part of every result cache key. Bump it with any change to parsing,
+# matching or rendering that changes the response for the same upload, so
+# responses cached by an older version of the app are never served.
+RESULT_CACHE_VERSION = 1
+
+result_cache = new_disk_cache('result', 'results', RESULT_CACHE_PATH, RESULT_CACHE_TTL,
+                              max_bytes=RESULT_CACHE_MAX_BYTES)
+
+
+def result_cache_key(document, font_size, include_summaries, age_window=None, output_format='json'):
+    """Hash the upload together with the options, skills table, reviewed aliases and code version that shape the result.
+
+    output_format is the /convert format the cached body belongs to.
+    """
+    digest = document_digest(document)
+    get_skill_aliases()
+    payload = json.dumps([RESULT_CACHE_VERSION, output_format, digest, font_size, include_summaries,
+                          SKILLS_FINGERPRINT, skill_aliases['revision'], age_window])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def summaries_complete(html):
+    """True if every rendered domain got its AI summary."""
+    return html.count('class="summary-box"') == html.count('class="domain-section"')
+
+
+def render_metrics():
+    """Return this process's metrics in the Prometheus text format."""
+    with metrics_lock:
+        histograms = {key: (list(h['counts']), h['sum']) for key, h in metric_histograms.items()}
+        samples = dict(metric_counters)
+
+    # Cache statistics are read when scraped
+    summary_stats = get_cache_stats(summary_cache)
+    result_stats = get_cache_stats(result_cache)
+    for cache, stats in (('summary', summary_stats), ('result', result_stats)):
+        for stat, result in (('hits', 'hit'), ('misses', 'miss'), ('errors', 'error')):
+            samples[(f'bdi3_{cache}_cache_requests_total', (('result', result),))] = stats[stat]
+    samples[('bdi3_summary_cache_entries', ())] = summary_stats['entries']
+    samples[('bdi3_result_cache_entries', ())] = result_stats['entries']
+    samples[('bdi3_result_cache_bytes', ())] = result_stats['bytes']
+    for gate in (parse_gate, summary_gate):
+        with gate['condition']:
+            samples[('bdi3_admission_in_flight', (('gate', gate['name']),))] = gate['running']
+            samples[('bdi3_admission_queued', (('gate', gate['name']),))] = gate['waiting']
+
+    lines = []
+    for name, (metric_type, help_text) in METRIC_TYPES.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+
+        if metric_type != 'histogram':
+            for (metric, labels), value in sorted(samples.items()):
+                if metric == name:
+                    lines.append(f'{name}{format_metric_labels(labels)} {value}')
+            continue
+
+        for (metric, labels), (counts, total) in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(METRIC_BUCKETS + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else str(bound)
+                lines.append(f'{name}_bucket{format_metric_labels(labels + (("le", le),))} {cumulative}')
+            lines.append(f'{name}_sum{format_metric_labels(labels)} {total}')
+            lines.append(f'{name}_count{format_metric_labels(labels)} {cumulative}')
+
+    return '\n'.join(lines) + '\n'
+
+
+@app.route('/metrics')
+def metrics():
+    if not METRICS_ENABLED:
+        return jsonify({'success': False, 'error': 'Metrics are disabled'}), 404
+    return app.response_class(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+def check_alias_admin():
+    """Return an error response unless the request carries ALIAS_ADMIN_TOKEN."""
+    if not ALIAS_ADMIN_TOKEN or not ALIAS_DB_PATH:
+        return jsonify({'success': False, 'error': 'Alias review is disabled'}), 404
+
+    expected = f'Bearer {ALIAS_ADMIN_TOKEN}'.encode('utf-8')
+    if not hmac.compare_digest(request.headers.get('Authorization', '').encode('utf-8'), expected):
+        return jsonify({'success': False, 'error': 'Invalid admin token'}), 401
+    return None
+
+
+def alias_request_skill(body):
+    """Return the reference skill named in a review request, or raise UploadError."""
+    skill = body.get('skill')
+    if skill not in SKILL_AGE_MAP:
+        raise UploadError(f'Unknown skill: {skill!r}')
+    return skill
+
+
+@app.route('/aliases', methods=['GET'])
+def list_aliases():
+    """List aliases (optionally one ?status) and the skills no report could match.
+
+    Both lists are most recent first, up to ?limit entries each.
+    """
+    error = check_alias_admin()
+    if error:
+        return error
+
+    status = request.args.get('status')
+    if status is not None and status not in ALIAS_STATUSES:
+        return jsonify({'success': False, 'error': f'Unknown status: {status}'}), 400
+    limit = request.args.get('limit', 200, type=int)
+
+    # Include this process's latest results; other workers' follow within
+    # ALIAS_FLUSH_INTERVAL
+    flush_match_results()
+    conn = open_alias_store()
+    conn.row_factory = sqlite3.Row
+    try:
+        aliases = conn.execute(
+            'SELECT id, extracted, domain, subdomain, skill, status, created_at, updated_at FROM aliases'
+            ' WHERE ? IS NULL OR status = ? ORDER BY updated_at DESC LIMIT ?',
+            (status, status, limit)
+        ).fetchall()
+        unmatched = conn.execute(
+            'SELECT extracted, domain, subdomain, seen, last_seen FROM unmatched'
+            ' ORDER BY last_seen DESC LIMIT ?',
+            (limit,)
+        ).fetchall()
+    finally:
+        conn.close()
+
+    return jsonify({
+        'success': True,
+        'aliases': [dict(row) for row in aliases],
+        'unmatched': [dict(row) for row in unmatched],
+    })
+
+
+@app.route('/aliases', methods=['POST'])
+def resolve_alias():
+    """Map an extracted skill text to a reference skill.
+
+    Takes JSON {"extracted", "domain", "subdomain", "skill"}, as listed
+    under "unmatched" by GET /aliases. The alias is stored as accepted,
+    replacing any existing alias for the text, and the text leaves the
+    unmatched list.
+    """
+    error = check_alias_admin()
+    if error:
+        return error
+
+    body = request.get_json(silent=True) or {}
+    try:
+        skill = alias_request_skill(body)
+        if not body.get('extracted'):
+            raise UploadError('Missing extracted skill text')
+    except UploadError as e:
+        return jsonify({'success': False, 'error': str(e)}), e.status_code
+
+    extracted = normalize_skill_text(body['extracted'])
+    key = alias_key(extracted, body.get('domain'), body.get('subdomain'))
+    now = time.time()
+    conn = open_alias_store()
+    try:
+        with conn:
+            conn.execute(
+                'INSERT INTO aliases (text, domain_key, subdomain_key, extracted, domain, subdomain,'
+                ' skill, status, fingerprint, created_at, updated_at)'
+                " VALUES (?, ?, ?, ?, ?, ?, ?, 'accepted', ?, ?, ?)"
+                ' ON CONFLICT (text, domain_key, subdomain_key) DO UPDATE SET'
+                ' skill = excluded.skill, status = excluded.status,'
+                ' fingerprint = excluded.fingerprint, updated_at = excluded.updated_at',
+                (*key, extracted, body.get('domain'), body.get('subdomain'), skill,
+                 SKILLS_FINGERPRINT, now, now)
+            )
+            conn.execute('DELETE FROM unmatched WHERE text = ? AND domain_key = ? AND subdomain_key = ?', key)
+            alias_id = conn.execute(
+                'SELECT id FROM aliases WHERE text = ? AND domain_key = ? AND subdomain_key = ?', key
+            ).fetchone()[0]
+    finally:
+        conn.close()
+
+    invalidate_skill_aliases()
+    return jsonify({'success': True, 'id': alias_id})
+
+
+def review_alias(alias_id, status):
+    error = check_alias_admin()
+    if error:
+        return error
+
+    body = request.get_json(silent=True) or {}
+    conn = open_alias_store()
+    try:
+        row = conn.execute(
+            'SELECT text, domain_key, subdomain_key, skill FROM aliases WHERE id = ?', (alias_id,)
+        ).fetchone()
+        if row is None:
+            return jsonify({'success': False, 'error': 'Alias not found'}), 404
+
+        skill = row[3]
+        if status == 'accepted' and 'skill' in body:
+            try:
+                skill = alias_request_skill(body)
+            except UploadError as e:
+                return jsonify({'success': False, 'error': str(e)}), e.status_code
+
+        with conn:
+            conn.execute('UPDATE aliases SET status = ?, skill = ?, updated_at = ? WHERE id = ?',
+                         (status, skill, time.time(), alias_id))
+            if status == 'accepted':
+                conn.execute('DELETE FROM unmatched WHERE text = ? AND domain_key = ? AND subdomain_key = ?',
+                             row[:3])
+    finally:
+        conn.close()
+
+    invalidate_skill_aliases()
+    return jsonify({'success': True, 'id': alias_id, 'status': status, 'skill': skill})
+
+
+@app.route('/aliases/<int:alias_id>/accept', methods=['POST'])
+def accept_alias(alias_id):
+    """Confirm an alias; JSON {"skill": ...} points it at a different reference skill."""
+    return review_alias(alias_id, 'accepted')
+
+
+@app.route('/aliases/<int:alias_id>/reject', methods=['POST'])
+def reject_alias(alias_id):
+    """Reject an alias: its text is reported as unmatched instead of fuzzy matched again."""
+    return review_alias(alias_id, 'rejected')
+
+
 @app.route('/')
 def index():
     return app.send_static_file('index.html')
 
+
+class UploadError(Exception):
+    """An upload that fails validation; the message is shown to the user.
+
+    status_code is the HTTP status of the error response.
+    """
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ServerBusy(Exception):
+    """A conversion turned away by admission control.
+
+    Answered with a 503 and a Retry-After header.
+    """
+
+
+# Admission control for conversions. Each gate lets `limit` conversions run at
+# once and up to `queue` more wait, each for at most ADMISSION_WAIT seconds,
+# for a free slot; beyond that a request is turned away straight away with a
+# 503 instead of slowing down every request in the worker. Parsing is
+# CPU-bound and summaries wait on the API, so they have separate gates and
+# slow summaries never hold up table-only conversions. The limits are per
+# worker process; 0 disables a gate.
+PARSE_ADMISSION_LIMIT = int(os.getenv('PARSE_ADMISSION_LIMIT', '2'))
+PARSE_ADMISSION_QUEUE = int(os.getenv('PARSE_ADMISSION_QUEUE', '4'))
+SUMMARY_ADMISSION_LIMIT = int(os.getenv('SUMMARY_ADMISSION_LIMIT', '4'))
+SUMMARY_ADMISSION_QUEUE = int(os.getenv('SUMMARY_ADMISSION_QUEUE', '4'))
+ADMISSION_WAIT = float(os.getenv('ADMISSION_WAIT', '10'))
+# Seconds a turned-away client is told to wait before retrying
+ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', '5'))
+
+
+def new_admission_gate(name, limit, queue_size):
+    return {'name': name, 'limit': limit, 'queue': queue_size, 'running': 0, 'waiting': 0,
+            'condition': threading.Condition()}
+
+
+# 'parse' covers parsing and matching a report; 'summary' a conversion with
+# AI summaries from parsing until its last summary has been sent
+parse_gate = new_admission_gate('parse', PARSE_ADMISSION_LIMIT, PARSE_ADMISSION_QUEUE)
+summary_gate = new_admission_gate('summary', SUMMARY_ADMISSION_LIMIT, SUMMARY_ADMISSION_QUEUE)
+
+
+def reject_admission(gate, reason):
+    increment('bdi3_admission_rejections_total', gate=gate['name'], reason=reason)
+    raise ServerBusy(f'The server is busy; please try again in {ADMISSION_RETRY_AFTER} seconds')
+
+
+def check_admission(gate):
+    """Turn a request away early, before its upload is read, if gate's queue is full."""
+    with gate['condition']:
+        if 0 < gate['limit'] <= gate['running'] and gate['waiting'] >= gate['queue']:
+            reject_admission(gate, 'queue_full')
+
+
+@contextlib.contextmanager
+def admitted(gate, timings=None, background=False):
+    """Hold one of gate's slots for the block, queueing for it if needed.
+
+    Raises ServerBusy when the queue is full or no slot frees up within
+    ADMISSION_WAIT. A background conversion (a batch document or a job)
+    is never turned away: it waits for a slot as long as it takes, outside
+    the queue. Time spent queueing is recorded as the stage '<gate>_queue'.
+    """
+    if gate['limit'] <= 0:
+        yield
+        return
+
+    condition = gate['condition']
+    with timed(f"{gate['name']}_queue", timings), condition:
+        if gate['running'] >= gate['limit'] and background:
+            condition.wait_for(lambda: gate['running'] < gate['limit'])
+        elif gate['running'] >= gate['limit']:
+            if gate['waiting'] >= gate['queue']:
+                reject_admission(gate, 'queue_full')
+            gate['waiting'] += 1
+            try:
+                free = condition.wait_for(lambda: gate['running'] < gate['limit'], ADMISSION_WAIT)
+            finally:
+                gate['waiting'] -= 1
+            if not free:
+                reject_admission(gate, 'timeout')
+        gate['running'] += 1
+
+    try:
+        yield
+    finally:
+        with condition:
+            gate['running'] -= 1
+            condition.notify()
+
+
+# Uploads are kept in memory, or in a temporary file once they grow past
+# UPLOAD_SPOOL_MAX_SIZE, so a large report never has to be held in a
+# worker's memory in one piece. 0 disables either limit.
+UPLOAD_SPOOL_MAX_SIZE = int(os.getenv('UPLOAD_SPOOL_MAX_SIZE', str(4 * 1024 * 1024)))
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', str(50 * 1024 * 1024)))
+# Largest /convert/batch request, all of its documents together
+MAX_BATCH_BYTES = int(os.getenv('MAX_BATCH_BYTES', str(500 * 1024 * 1024)))
+MAX_PDF_PAGES = int(os.getenv('MAX_PDF_PAGES', '500'))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Room for the form fields and multipart headers around an upload of
+# MAX_UPLOAD_BYTES or a batch of MAX_BATCH_BYTES
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+
+
+class UploadRequest(Request):
+    """A request whose uploaded files are spooled the way spool_upload spools.
+
+    Werkzeug writes each uploaded file straight into the stream returned
+    here, so the PDF is received once and read in place: in memory when
+    the request is no larger than UPLOAD_SPOOL_MAX_SIZE, otherwise in a
+    named temporary file that can be memory-mapped and reopened by parse
+    workers.
+    """
+
+    @property
+    def max_content_length(self):
+        # A batch holds many documents, each also limited to MAX_UPLOAD_BYTES
+        if self.endpoint == 'convert_batch':
+            return MAX_BATCH_BYTES + UPLOAD_FORM_OVERHEAD if MAX_BATCH_BYTES else None
+        return super().max_content_length
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is not None and total_content_length <= UPLOAD_SPOOL_MAX_SIZE:
+            return io.BytesIO()
+        return tempfile.NamedTemporaryFile(suffix='.pdf')
+
+
+# Requests larger than one upload are refused from their Content-Length,
+# before any of the body is read
+app.request_class = UploadRequest
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES + UPLOAD_FORM_OVERHEAD if MAX_UPLOAD_BYTES else None
+
+
+def upload_too_large():
+    """The UploadError for a document over MAX_UPLOAD_BYTES."""
+    return UploadError(f'File is larger than the {MAX_UPLOAD_BYTES / (1024 * 1024):.3g} MB limit', 413)
+
+
+def spool_upload(stream):
+    """Copy an uploaded document from stream into a seekable file.
+
+    Used for documents that don't arrive as a whole request file, such as
+    the entries of a zip archive. The copy stays in memory up to
+    UPLOAD_SPOOL_MAX_SIZE and moves to a named temporary file beyond that.
+    It is returned rewound; close it when done. Raises UploadError past
+    MAX_UPLOAD_BYTES.
+    """
+    spooled = io.BytesIO()
+    size = 0
+    try:
+        for chunk in iter(functools.partial(stream.read, UPLOAD_CHUNK_SIZE), b''):
+            size += len(chunk)
+            if MAX_UPLOAD_BYTES and size > MAX_UPLOAD_BYTES:
+                raise upload_too_large()
+            if isinstance(spooled, io.BytesIO) and size > UPLOAD_SPOOL_MAX_SIZE:
+                on_disk = tempfile.NamedTemporaryFile(suffix='.pdf')
+                on_disk.write(spooled.getbuffer())
+                spooled = on_disk
+            spooled.write(chunk)
+    except BaseException:
+        spooled.close()
+        raise
+
+    spooled.seek(0)
+    return spooled
+
+
+def rewind_upload(stream):
+    """Rewind a file spooled by UploadRequest to convert it in place.
+
+    Raises UploadError past MAX_UPLOAD_BYTES.
+    """
+    if MAX_UPLOAD_BYTES and stream.seek(0, io.SEEK_END) > MAX_UPLOAD_BYTES:
+        raise upload_too_large()
+    stream.seek(0)
+    return stream
+
+
+def spool_archive_entry(archive, info):
+    """Spool one document of a zip archive like an upload."""
+    with archive.open(info) as entry:
+        return spool_upload(entry)
+
+
+def document_digest(document):
+    """SHA-256 hex digest of a document given as bytes or a binary file.
+
+    A file is read in chunks and rewound.
+    """
+    if isinstance(document, bytes):
+        return hashlib.sha256(document).hexdigest()
+
+    document.seek(0)
+    digest = hashlib.file_digest(document, 'sha256').hexdigest()
+    document.seek(0)
+    return digest
+
+
+def read_conversion_request():
+    """Validate the uploaded PDF and read the conversion options.
+
+    Returns (upload, font_size, include_summaries) where upload is the PDF
+    as spooled by UploadRequest, rewound; the caller closes it. Raises
+    UploadError for a missing, non-PDF or oversized file, or an invalid
+    font size.
+    """
+    try:
+        files = request.files
+    except RequestEntityTooLarge:
+        raise upload_too_large()
+
+    if 'file' not in files:
+        raise UploadError('No file uploaded')
+
+    file = files['file']
+    if file.filename == '':
+        raise UploadError('No file selected')
+
+    if not file.filename.endswith('.pdf'):
+        raise UploadError('File must be a PDF')
+
+    font_size = read_font_size()
+
+    # Get AI summary option (default to true if API key is available)
+    include_summaries = request.form.get('include_summaries', 'true').lower() == 'true'
+
+    return rewind_upload(file.stream), font_size, include_summaries
+
+
+# Font sizes, in points, that the tables can be rendered at
+MIN_FONT_SIZE = 4
+MAX_FONT_SIZE = 72
+
+
+def read_font_size():
+    """Read the font_size option of a conversion request (8pt Arial by default).
+
+    Returns it as a string rounded to the nearest half point, the precision
+    Word stores, e.g. '8' or '10.5'. Raises UploadError for values that
+    aren't numbers from MIN_FONT_SIZE to MAX_FONT_SIZE.
+    """
+    font_size = request.form.get('font_size', '8').strip()
+    try:
+        size = float(font_size)
+    except ValueError:
+        size = None
+    # NaN fails both comparisons, and infinities fail one
+    if size is None or not MIN_FONT_SIZE <= size <= MAX_FONT_SIZE:
+        raise UploadError(f'font_size must be a number of points from {MIN_FONT_SIZE} to {MAX_FONT_SIZE}')
+    return f'{round(size * 2) / 2:g}'
+
+
+# Months either side of child_age_months that /convert keeps by default
+AGE_WINDOW_MONTHS = 12
+
+
+def read_age_window():
+    """Read the optional age filter of a /convert request.
+
+    child_age_months is the child's age and age_window_months how far
+    either side of it (AGE_WINDOW_MONTHS by default) a skill's age range
+    must reach to be shown. Returns (min_months, max_months), or None
+    without child_age_months. Raises UploadError for values that aren't
+    whole numbers of months.
+    """
+    child_age = request.form.get('child_age_months', '').strip()
+    if not child_age:
+        return None
+
+    window = request.form.get('age_window_months', '').strip() or str(AGE_WINDOW_MONTHS)
+    if not (child_age.isdigit() and window.isdigit()):
+        raise UploadError('child_age_months and age_window_months must be whole numbers of months')
+    child_age, window = int(child_age), int(window)
+    return max(child_age - window, 0), child_age + window
+
+
+def parse_report(document, progress=None, timings=None, admit=False, age_window=None, background=False):
+    """Parse and match one report given as bytes or a binary file.
+
+    Returns (pdf_data, stats) where stats is the 'stats' block of the
+    /convert response. Stage timings are added to timings, if given. With
+    admit, parsing first waits for a slot of parse_gate (see admitted, which
+    is also passed background).
+    With age_window, only the skills it keeps are returned (see
+    filter_age_window) and stats reports how many.
+    """
+    if progress:
+        progress('stage', {'stage': 'parse'})
+
+    # Track unmatched skills for this PDF only
+    match_context = new_match_context()
+
+    # Parse PDF
+    with admitted(parse_gate, timings, background) if admit else contextlib.nullcontext():
+        pdf_data = parse_bdi3_pdf(document, progress, match_context, timings)
+
+    # Get match statistics
+    match_stats = get_match_stats(match_context)
+
+    # Count total skills extracted
+    total_skills = sum(
+        len(skills)
+        for domain in pdf_data.values()
+        for skills in domain.values()
+    )
+
+    stats = {
+        'total_skills_extracted': total_skills,
+        'skills_in_database': match_stats['total_skills_in_json'],
+        'unmatched_count': match_stats['unmatched_count'],
+        'unmatched_skills': match_stats['unmatched_skills'],
+        'page_strategies': match_stats['page_strategies']
+    }
+
+    if age_window is not None:
+        pdf_data = filter_age_window(pdf_data, age_window)
+        stats['age_window'] = {
+            'min_months': age_window[0],
+            'max_months': age_window[1],
+            'skills_shown': sum(len(skills) for domain in pdf_data.values() for skills in domain.values()),
+        }
+
+    return pdf_data, stats
+
+
+def run_conversion(document, font_size, include_summaries, progress=None, timings=None, admit=False,
+                   age_window=None, background=False):
+    """Parse, match, render and summarise one report given as bytes or a binary file.
+
+    Returns the JSON body of a successful /convert response. Needs an app
+    context. progress, if given, is called as progress(event, data) when a
+    stage starts and as each domain table and summary is ready. Stage
+    timings are added to timings, if given. admit, age_window and
+    background are passed to parse_report; with admit, a report with
+    summaries also waits for a slot of summary_gate, once the result cache
+    has missed.
+    """
+    summaries = include_summaries and get_anthropic_client() is not None
+
+    # Byte-identical uploads with the same options reuse the stored response
+    cache_key = result_cache_key(document, font_size, summaries, age_window)
+    with timed('result_cache', timings):
+        cached = cache_get(result_cache, cache_key)
+    if cached is not None:
+        return cached
+
+    with admitted(summary_gate, timings, background) if admit and summaries else contextlib.nullcontext():
+        pdf_data, stats = parse_report(document, progress, timings, admit, age_window, background)
+
+        # Generate HTML tables with font size and optional summaries
+        html_tables = generate_html_tables(pdf_data, font_size, include_summaries, progress, timings)
+
+    # Return HTML with match statistics
+    result = {
+        'success': True,
+        'html': html_tables,
+        'stats': stats
+    }
+    body = jsonify(result).get_data(as_text=True)
+
+    # Don't cache a result whose summaries failed or timed out
+    if not summaries or summaries_complete(html_tables):
+        cache_put(result_cache, cache_key, body)
+
+    return body
+
+
 @app.route('/convert', methods=['POST'])
 def convert_pdf():
+    """Convert one report.
+
+    Returns JSON with the HTML tables and match statistics. With
+    format=html the tables are streamed as text/html while they render,
+    and the statistics are sent as X-* headers. With format=events the
+    report is streamed as Server-Sent Events with the AI summaries' text
+    sent as it is generated (see iter_report_events). JSON and event
+    responses for a byte-identical upload come from the result cache. With
+    format=docx the report is returned as a Word document. Every format can
+    be limited to the skills around the child's age (see read_age_window).
+
+    With metrics enabled, the time spent in each stage before the response
+    starts is sent in a Server-Timing header. Conversions beyond the
+    admission limits get a 503 with a Retry-After header.
+    """
+    timings = {} if METRICS_ENABLED else None
     try:
-        if 'file' not in request.files:
-            return jsonify({'success': False, 'error': 'No file uploaded'}), 400
+        check_admission(parse_gate)
+        # Reads the form first, so an oversized upload gets its 413
+        upload, font_size, include_summaries = read_conversion_request()
+        age_window = read_age_window()
+        output_format = request.form.get('format', 'json')
+
+        summaries = include_summaries and get_anthropic_client() is not None
+
+        # Every format has parsed the upload before its response starts
+        with upload, contextlib.ExitStack() as admission:
+            def admit_summaries():
+                # Taken only once a conversion is needed, so cache hits never queue
+                if summaries:
+                    admission.enter_context(admitted(summary_gate, timings))
+
+            if output_format == 'html':
+                admit_summaries()
+                pdf_data, stats = parse_report(upload, timings=timings, admit=True, age_window=age_window)
+                headers = {
+                    'X-Total-Skills-Extracted': str(stats['total_skills_extracted']),
+                    'X-Skills-In-Database': str(stats['skills_in_database']),
+                    'X-Unmatched-Count': str(stats['unmatched_count'])
+                }
+                chunks = iter_html_tables(pdf_data, font_size, include_summaries)
+                response = app.response_class(stream_with_context(chunks), mimetype='text/html',
+                                              headers=headers)
+
+            elif output_format == 'events':
+                # A cached report is sent whole, without the summaries' deltas
+                cache_key = result_cache_key(upload, font_size, summaries, age_window, output_format)
+                with timed('result_cache', timings):
+                    events = cache_get(result_cache, cache_key)
+                if events is None:
+                    admit_summaries()
+                    pdf_data, stats = parse_report(upload, timings=timings, admit=True, age_window=age_window)
+                    events = stream_with_context(
+                        iter_report_events(pdf_data, stats, font_size, include_summaries, cache_key))
+                response = app.response_class(events, mimetype='text/event-stream',
+                                              headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+            elif output_format == 'docx':
+                admit_summaries()
+                pdf_data, _ = parse_report(upload, timings=timings, admit=True, age_window=age_window)
+                with timed('docx', timings):
+                    response = send_docx(pdf_data, font_size, include_summaries,
+                                         request.files['file'].filename)
+
+            elif output_format == 'json':
+                # Takes its summary slot after checking the result cache
+                body = run_conversion(upload, font_size, include_summaries, timings=timings, admit=True,
+                                      age_window=age_window)
+                response = app.response_class(body, mimetype='application/json')
+
+            else:
+                raise UploadError(f'Unsupported format: {output_format}')
+
+            # Streamed summaries keep their slot until the response is sent
+            if response.is_streamed:
+                response.call_on_close(admission.pop_all().close)
+
+        if timings:
+            response.headers['Server-Timing'] = server_timing_header(timings)
+        return response
+
+    except ServerBusy as e:
+        return (jsonify({'success': False, 'error': str(e)}), 503,
+                {'Retry-After': str(ADMISSION_RETRY_AFTER)})
+    except UploadError as e:
+        return jsonify({'success': False, 'error': str(e)}), e.status_code
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
 
-        file = request.files['file']
-        if file.filename == '':
-            return jsonify({'success': False, 'error': 'No file selected'}), 400
 
-        if not file.filename.endswith('.pdf'):
-            return jsonify({'success': False, 'error': 'File must be a PDF'}), 400
+# Documents of a batch upload converted at once per worker process
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', '4'))
 
-        # Get font size from request (default to 8pt Arial)
-        font_size = request.form.get('font_size', '8')
+# Created on first use so workers that never see a batch never start threads
+batch_executor = None
 
-        # Get AI summary option (default to true if API key is available)
-        include_summaries = request.form.get('include_summaries', 'true').lower() == 'true'
 
-        # Clear unmatched skills tracking before parsing new PDF
-        clear_unmatched_skills()
+def iter_batch_documents(uploads):
+    """Yield (filename, spool) for every document of a batch upload.
 
-        # Parse PDF
-        pdf_data = parse_bdi3_pdf(file)
+    Zip archives are expanded entry by entry, and nothing is read until
+    spool() is called, so only the documents being converted are spooled.
+    PDFs are converted in place, as UploadRequest received them. spool()
+    returns the document rewound, as a file to close when done.
+    """
+    for upload in uploads:
+        if upload.filename.lower().endswith('.zip'):
+            archive = zipfile.ZipFile(upload.stream)
+            for info in archive.infolist():
+                if info.is_dir() or info.filename.startswith('__MACOSX/'):
+                    continue
+                yield info.filename, functools.partial(spool_archive_entry, archive, info)
+        else:
+            yield upload.filename, functools.partial(rewind_upload, upload.stream)
 
-        # Generate HTML tables with font size and optional summaries
-        html_tables = generate_html_tables(pdf_data, font_size, include_summaries)
 
-        # Get match statistics
-        match_stats = get_match_stats()
+def convert_batch_document(index, filename, spool, font_size, include_summaries):
+    """Convert one batch document; errors are reported in the result, not raised."""
+    result = {'index': index, 'filename': filename}
 
-        # Count total skills extracted
-        total_skills = sum(
-            len(skills)
-            for domain in pdf_data.values()
-            for skills in domain.values()
-        )
+    if not filename.endswith('.pdf'):
+        result.update({'success': False, 'error': 'File must be a PDF'})
+        return result
+
+    try:
+        with spool() as document, app.app_context():
+            body = run_conversion(document, font_size, include_summaries, admit=True, background=True)
+        result.update(json.loads(body))
+    except Exception as e:
+        result.update({'success': False, 'error': str(e)})
+    return result
+
+
+@app.route('/convert/batch', methods=['POST'])
+def convert_batch():
+    """Convert many PDFs, or zip archives of PDFs, in one request.
+
+    Streams one NDJSON line per document as soon as it is converted, in
+    completion order: the /convert response plus 'index' and 'filename'.
+    At most BATCH_CONCURRENCY documents are read and converted at a time.
+    """
+    global batch_executor
+
+    try:
+        files = request.files
+    except RequestEntityTooLarge:
+        return jsonify({
+            'success': False,
+            'error': f'Batch is larger than the {MAX_BATCH_BYTES / (1024 * 1024):.3g} MB limit'
+        }), 413
+
+    uploads = [upload for upload in files.getlist('files') + files.getlist('file') if upload.filename]
+    if not uploads:
+        return jsonify({'success': False, 'error': 'No file uploaded'}), 400
+
+    try:
+        font_size = read_font_size()
+    except UploadError as e:
+        return jsonify({'success': False, 'error': str(e)}), e.status_code
+    include_summaries = request.form.get('include_summaries', 'true').lower() == 'true'
+
+    if batch_executor is None:
+        with executor_lock:
+            if batch_executor is None:
+                batch_executor = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix='batch')
+
+    def generate():
+        documents = enumerate(iter_batch_documents(uploads))
+        pending = set()
+
+        def submit_next():
+            for index, (filename, spool) in documents:
+                pending.add(batch_executor.submit(convert_batch_document, index, filename,
+                                                  spool, font_size, include_summaries))
+                return
+
+        for _ in range(BATCH_CONCURRENCY):
+            submit_next()
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.remove(future)
+                submit_next()
+                yield json.dumps(future.result()) + '\n'
+
+    return app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+# Background conversion jobs. Job state and progress events live in a
+# SQLite file so any worker process can answer status and event requests.
+JOB_DB_PATH = os.getenv('JOB_DB_PATH', os.path.join(tempfile.gettempdir(), 'bdi3_jobs.sqlite3'))
+JOB_UPLOAD_DIR = os.getenv('JOB_UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'bdi3_job_uploads'))
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+JOB_TTL = float(os.getenv('JOB_TTL', '3600'))
+
+# How often the event stream polls for new events, and sends a keep-alive
+JOB_EVENT_POLL_INTERVAL = 0.25
+JOB_EVENT_KEEPALIVE = 15
+# Seconds an event stream stays open; EventSource clients then reconnect
+# and resume after Last-Event-ID
+JOB_EVENT_STREAM_MAX = float(os.getenv('JOB_EVENT_STREAM_MAX', '300'))
+
+# The process that queued a job renews its heartbeat every
+# JOB_HEARTBEAT_INTERVAL seconds until the job finishes. A queued or running
+# job whose heartbeat is older than JOB_LEASE seconds lost its worker
+# process (killed, restarted or out of memory) and is marked failed.
+JOB_HEARTBEAT_INTERVAL = 10
+JOB_LEASE = float(os.getenv('JOB_LEASE', '60'))
+
+# Created on first use so workers that never run jobs never start threads
+job_executor = None
+
+# Ids of the jobs queued or running in this process, kept alive by
+# beat_jobs
+active_jobs = set()
+active_jobs_lock = threading.Lock()
+
+
+def open_job_store():
+    """Open the job database, creating it if needed."""
+    conn = sqlite3.connect(JOB_DB_PATH, timeout=5)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS jobs ('
+        ' id TEXT PRIMARY KEY,'
+        ' status TEXT NOT NULL,'
+        ' stage TEXT,'
+        ' result TEXT,'
+        ' error TEXT,'
+        ' created_at REAL NOT NULL,'
+        ' updated_at REAL NOT NULL,'
+        ' heartbeat_at REAL)'
+    )
+    if 'heartbeat_at' not in [row[1] for row in conn.execute('PRAGMA table_info(jobs)')]:
+        # Made by an older version of the app; another process may be
+        # adding the column at the same moment
+        try:
+            conn.execute('ALTER TABLE jobs ADD COLUMN heartbeat_at REAL')
+        except sqlite3.OperationalError as e:
+            if 'duplicate column' not in str(e):
+                raise
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS job_events ('
+        ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+        ' job_id TEXT NOT NULL,'
+        ' event TEXT NOT NULL,'
+        ' data TEXT NOT NULL)'
+    )
+    conn.execute('CREATE INDEX IF NOT EXISTS job_events_job ON job_events (job_id, id)')
+    return conn
+
+
+def purge_expired_jobs(conn):
+    """Delete jobs older than JOB_TTL together with their events and uploads."""
+    cutoff = time.time() - JOB_TTL
+    expired = [row[0] for row in conn.execute('SELECT id FROM jobs WHERE created_at < ?', (cutoff,))]
+    for job_id in expired:
+        conn.execute('DELETE FROM job_events WHERE job_id = ?', (job_id,))
+        conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+        upload_path = os.path.join(JOB_UPLOAD_DIR, f'{job_id}.pdf')
+        if os.path.exists(upload_path):
+            os.remove(upload_path)
+
+
+def create_job(upload):
+    """Store an upload and register a queued job for it. Returns the job id."""
+    job_id = uuid.uuid4().hex
+
+    os.makedirs(JOB_UPLOAD_DIR, exist_ok=True)
+    with open(os.path.join(JOB_UPLOAD_DIR, f'{job_id}.pdf'), 'wb') as f:
+        shutil.copyfileobj(upload, f)
+
+    conn = open_job_store()
+    try:
+        with conn:
+            purge_expired_jobs(conn)
+            now = time.time()
+            conn.execute(
+                'INSERT INTO jobs (id, status, created_at, updated_at, heartbeat_at) VALUES (?, ?, ?, ?, ?)',
+                (job_id, 'queued', now, now, now)
+            )
+    finally:
+        conn.close()
+    return job_id
+
+
+def update_job(job_id, event=None, data=None, **fields):
+    """Update a job's columns and optionally record a progress event."""
+    conn = open_job_store()
+    try:
+        with conn:
+            if event:
+                conn.execute(
+                    'INSERT INTO job_events (job_id, event, data) VALUES (?, ?, ?)',
+                    (job_id, event, data if isinstance(data, str) else json.dumps(data))
+                )
+            fields['updated_at'] = time.time()
+            assignments = ', '.join(f'{column} = ?' for column in fields)
+            conn.execute(f'UPDATE jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+    finally:
+        conn.close()
+
+
+def fail_abandoned_job(conn, job_id):
+    """Mark a job failed if it is unfinished and its lease has run out."""
+    now = time.time()
+    error = 'The job was interrupted; please submit it again'
+    with conn:
+        abandoned = conn.execute(
+            "UPDATE jobs SET status = 'failed', stage = NULL, error = ?, updated_at = ? "
+            "WHERE id = ? AND status IN ('queued', 'running') AND COALESCE(heartbeat_at, updated_at) < ?",
+            (error, now, job_id, now - JOB_LEASE)
+        ).rowcount
+        if abandoned:
+            conn.execute(
+                'INSERT INTO job_events (job_id, event, data) VALUES (?, ?, ?)',
+                (job_id, 'error', json.dumps({'error': error}))
+            )
+
+
+def get_job(job_id):
+    """Return a job's row as a dict, or None if it does not exist.
+
+    An unfinished job whose lease has run out is marked failed first (see
+    JOB_LEASE).
+    """
+    conn = open_job_store()
+    try:
+        conn.row_factory = sqlite3.Row
+        row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        unfinished = row and row['status'] in ('queued', 'running')
+        if unfinished and (row['heartbeat_at'] or row['updated_at']) < time.time() - JOB_LEASE:
+            fail_abandoned_job(conn, job_id)
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    finally:
+        conn.close()
+    return dict(row) if row else None
+
+
+def get_job_events(job_id, after_id=0):
+    """Return a job's (event_id, event, data) tuples newer than after_id."""
+    conn = open_job_store()
+    try:
+        return conn.execute(
+            'SELECT id, event, data FROM job_events WHERE job_id = ? AND id > ? ORDER BY id',
+            (job_id, after_id)
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def beat_jobs():
+    """Renew the heartbeat of this process's jobs until the process exits."""
+    while True:
+        time.sleep(JOB_HEARTBEAT_INTERVAL)
+        with active_jobs_lock:
+            job_ids = list(active_jobs)
+        if not job_ids:
+            continue
+
+        try:
+            conn = open_job_store()
+            try:
+                with conn:
+                    conn.execute(
+                        f'UPDATE jobs SET heartbeat_at = ? WHERE id IN ({", ".join("?" * len(job_ids))})',
+                        (time.time(), *job_ids)
+                    )
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f'Job heartbeat error: {e}')
+
+
+def run_job(job_id, font_size, include_summaries):
+    """Run a queued job on the job pool, recording its progress."""
+    upload_path = os.path.join(JOB_UPLOAD_DIR, f'{job_id}.pdf')
+
+    def progress(event, data):
+        if event == 'stage':
+            update_job(job_id, event, data, stage=data['stage'])
+        else:
+            update_job(job_id, event, data)
+
+    try:
+        update_job(job_id, status='running')
+        with open(upload_path, 'rb') as f, app.app_context():
+            body = run_conversion(f, font_size, include_summaries, progress, admit=True, background=True)
+        # Recorded as compact JSON: jsonify pretty-prints under app.debug,
+        # and an SSE data field ends at the first newline
+        update_job(job_id, 'done', json.loads(body), status='done', stage=None, result=body)
+    except Exception as e:
+        update_job(job_id, 'error', {'error': str(e)}, status='failed', error=str(e))
+    finally:
+        with active_jobs_lock:
+            active_jobs.discard(job_id)
+        if os.path.exists(upload_path):
+            os.remove(upload_path)
+
+
+@app.route('/jobs', methods=['POST'])
+def create_conversion_job():
+    """Queue a conversion and return its id without waiting for it."""
+    global job_executor
+
+    try:
+        upload, font_size, include_summaries = read_conversion_request()
+        with upload:
+            job_id = create_job(upload)
+
+        if job_executor is None:
+            with executor_lock:
+                if job_executor is None:
+                    job_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='job')
+                    threading.Thread(target=beat_jobs, name='job-heartbeat', daemon=True).start()
+        with active_jobs_lock:
+            active_jobs.add(job_id)
+        job_executor.submit(run_job, job_id, font_size, include_summaries)
 
-        # Return HTML with match statistics
         return jsonify({
             'success': True,
-            'html': html_tables,
-            'stats': {
-                'total_skills_extracted': total_skills,
-                'skills_in_database': match_stats['total_skills_in_json'],
-                'unmatched_count': match_stats['unmatched_count'],
-                'unmatched_skills': match_stats['unmatched_skills']
-            }
-        })
+            'job_id': job_id,
+            'status_url': f'/jobs/{job_id}',
+            'events_url': f'/jobs/{job_id}/events'
+        }), 202
 
+    except UploadError as e:
+        return jsonify({'success': False, 'error': str(e)}), e.status_code
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_conversion_job(job_id):
+    """Return a job's status, and its /convert-style result once done."""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+
+    response = {
+        'success': True,
+        'job': {
+            'id': job['id'],
+            'status': job['status'],
+            'stage': job['stage'],
+            'created_at': job['created_at'],
+            'updated_at': job['updated_at']
+        }
+    }
+    if job['status'] == 'done':
+        response['result'] = json.loads(job['result'])
+    elif job['status'] == 'failed':
+        response['error'] = job['error']
+    return jsonify(response)
+
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def stream_conversion_job(job_id):
+    """Stream a job's progress as Server-Sent Events.
+
+    Events: 'stage' ({stage}), 'table' and 'summary' ({domain, html}) as
+    each domain is ready, then 'done' (the /convert response body) or
+    'error'. A stream ends after JOB_EVENT_STREAM_MAX seconds even if the
+    job is still running; reconnecting clients resume after Last-Event-ID.
+    """
+    if get_job(job_id) is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+
+    last_id = request.headers.get('Last-Event-ID', '0')
+    last_id = int(last_id) if last_id.isdigit() else 0
+
+    def generate():
+        nonlocal last_id
+        last_sent = time.monotonic()
+        deadline = last_sent + JOB_EVENT_STREAM_MAX
+        while time.monotonic() < deadline:
+            # Read the status first: every event of a finished job was
+            # written before its status changed
+            job = get_job(job_id)
+            for event_id, event, data in get_job_events(job_id, last_id):
+                last_id = event_id
+                last_sent = time.monotonic()
+                lines = ''.join(f'data: {line}\n' for line in data.splitlines())
+                yield f'id: {event_id}\nevent: {event}\n{lines}\n'
+
+            if job is None or job['status'] in ('done', 'failed'):
+                return
+
+            if time.monotonic() - last_sent > JOB_EVENT_KEEPALIVE:
+                last_sent = time.monotonic()
+                yield ': keep-alive\n\n'
+            time.sleep(JOB_EVENT_POLL_INTERVAL)
+
+    return app.response_class(generate(), mimetype='text/event-stream',
+                              headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 # Known BDI-3 subdomain names - used to fix truncated names from PDF extraction
 BDI3_SUBDOMAINS = {
     # Social-Emotional domain
@@ -309,172 +2280,929 @@ def normalize_subdomain(subdomain_text):
     # Return as-is if no match
     return subdomain_text
 
-def parse_bdi3_pdf(file):
-    """Parse BDI-3 PDF and extract domain, subdomain, skill, and mastery data."""
+def parse_skill_row(domain_subdomain, skill, mastery):
+    """Normalize one "Domain: Subdomain | Skill | Mastery" row.
+
+    Returns (domain, subdomain, skill, mastery_status), or None if the row
+    is not a skill row.
+    """
+    # Parse domain and subdomain from first column
+    if ':' not in domain_subdomain:
+        return None
+
+    match = re.match(r'(Adaptive|Social-Emotional|Motor|Cognitive):\s*(.+)', domain_subdomain, re.IGNORECASE)
+    if not match:
+        return None
+
+    domain = match.group(1)
+    # Normalize domain name
+    if 'adaptive' in domain.lower():
+        domain = 'Adaptive'
+    elif 'social' in domain.lower():
+        domain = 'Social-Emotional'
+    elif 'motor' in domain.lower():
+        domain = 'Motor'
+    elif 'cognitive' in domain.lower():
+        domain = 'Cognitive'
+    else:
+        return None
+
+    subdomain = normalize_subdomain(match.group(2).strip())
+
+    # Normalize mastery status
+    mastery_upper = mastery.upper()
+    if 'MASTERED' in mastery_upper:
+        mastery_status = 'MASTERED'
+    elif 'EMERGING' in mastery_upper:
+        mastery_status = 'EMERGING'
+    elif 'FUTURE' in mastery_upper:
+        mastery_status = 'FUTURE LEARNING OBJECTIVE'
+    else:
+        return None  # Skip rows without valid mastery status
+
+    return domain, subdomain, skill, mastery_status
+
+
+# Item Level Scores pages hold one fixed three-column table, so once its
+# column boundaries are known, a page's words can be sorted into rows and
+# columns by position, which is much faster than pdfplumber's table finder
+COLUMN_HEADER_WORDS = ('SKILL', 'MASTERY')
+
+# Words whose tops are this close (in points) are on the same line
+LINE_TOLERANCE = 3
+
+def group_lines(words):
+    """Group words into lines from top to bottom, each sorted left to right."""
+    lines = []
+    for word in sorted(words, key=lambda word: word['top']):
+        if lines and word['top'] - lines[-1][0]['top'] <= LINE_TOLERANCE:
+            lines[-1].append(word)
+        else:
+            lines.append([word])
+    return [sorted(line, key=lambda word: word['x0']) for line in lines]
+
+
+def find_column_boundaries(lines, vertical_rules):
+    """Return the x positions where the skill and mastery columns start, or None.
+
+    The columns are found from the "SKILL" and "MASTERY" header words:
+    each starts at the nearest vertical rule left of its header word, or
+    at the word itself when the table has no rules. vertical_rules returns
+    the sorted x positions of the page's vertical rules; it is only called
+    once the header is found.
+    """
+    for line in lines:
+        header_x = {word['text']: word['x0'] for word in line}
+        if all(header in header_x for header in COLUMN_HEADER_WORDS):
+            break
+    else:
+        return None
+
+    rules = vertical_rules()
+    boundaries = []
+    left = line[0]['x0']
+    for header in COLUMN_HEADER_WORDS:
+        x = header_x[header]
+        rule = bisect.bisect_right(rules, x + 1)
+        boundary = rules[rule - 1] if rule and rules[rule - 1] > left else x - 1
+        boundaries.append(boundary)
+        left = boundary
+    return boundaries
+
+
+def column_rows(lines, boundaries):
+    """Sort a page's lines of words into skill rows by column position.
+
+    A row runs from a line starting with "Domain:" to the next such line,
+    so wrapped skills and subdomains split over several lines are joined
+    by position. Skill lines are joined with newlines, like the table
+    finder's cell text. Returns the rows, or None if any row doesn't parse.
+    """
+    row_cells = []
+    cells = None
+    previous_bottom = None
+    for line in lines:
+        columns = ([], [], [])
+        for word in line:
+            columns[bisect.bisect_right(boundaries, word['x0'])].append(word['text'])
+
+        if DOMAIN_MARKER_RE.match(' '.join(columns[0])):
+            cells = ([], [], [])
+            row_cells.append(cells)
+        elif cells is not None and line[0]['top'] - previous_bottom > line[0]['height']:
+            # A gap after the table (page footer and the like)
+            cells = None
+        if cells is None:
+            continue
+
+        for cell, texts in zip(cells, columns):
+            if texts:
+                cell.append(' '.join(texts))
+        previous_bottom = max(word['bottom'] for word in line)
+
+    rows = []
+    for domain_subdomain, skill, mastery in row_cells:
+        parsed = parse_skill_row(' '.join(domain_subdomain), '\n'.join(skill), ' '.join(mastery))
+        if parsed is None:
+            return None
+        rows.append(parsed)
+    return rows or None
+
+
+def extract_column_rows(page, layout):
+    """Extract a page's skill rows from word positions.
+
+    layout is shared by the pages of one document: the column boundaries
+    are found on the first page with the table header and reused for the
+    rest (see column_rows).
+
+    Returns the rows, or None when the page doesn't fit the layout (no
+    known columns, pipe-separated text, or a row that doesn't parse), so
+    the caller can fall back to the table finder.
+    """
+    # Pipe-separated pages are read by the text parser
+    if any(char['text'] == '|' for char in page.chars):
+        return None
+
+    lines = group_lines(page.extract_words())
+    if layout.get('columns') is None:
+        layout['columns'] = find_column_boundaries(
+            lines, lambda: sorted(edge['x0'] for edge in page.vertical_edges))
+    if layout['columns'] is None:
+        return None
+    return column_rows(lines, layout['columns'])
+
+
+def parse_pipe_text(text):
+    """Parse the "Domain: Subdomain | Skill | Mastery" lines of a page's text."""
+    rows = []
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line or 'DOMAIN' in line.upper():
+            continue
+
+        # Try pipe-separated format: Domain:Subdomain | Skill | Mastery
+        if '|' in line:
+            parts = [p.strip() for p in line.split('|')]
+            if len(parts) >= 3:
+                parsed = parse_skill_row(parts[0], parts[1], parts[2])
+                if parsed:
+                    rows.append(parsed)
+    return rows
+
+
+def extract_page_rows(page, seconds=None, layout=None):
+    """Extract the skill rows of one Item Level Scores page, in page order.
+
+    Word positions are tried first (see extract_column_rows), when layout,
+    the document's shared column layout, is given. Next come pdfplumber's
+    tables; the pipe-separated text fallback only runs when they produce no
+    usable rows. All read the same page object, so pdfplumber parses the
+    page's layout objects once.
+
+    Returns (rows, strategy) where strategy is 'columns', 'table', 'text'
+    or 'none'. The time spent on each is stored in seconds['columns'],
+    seconds['table'] and seconds['text'], if given.
+    """
+    if layout is not None:
+        start = time.perf_counter()
+        rows = extract_column_rows(page, layout)
+        if seconds is not None:
+            seconds['columns'] = time.perf_counter() - start
+        if rows:
+            return rows, 'columns'
+
+    rows = []
+    start = time.perf_counter()
+
+    # Try to extract tables first
+    tables = page.extract_tables()
+
+    if tables:
+        # Process table data
+        for table in tables:
+            for row in table:
+                if not row or len(row) < 2:
+                    continue
+
+                # Handle varying column counts - join first columns if subdomain is split
+                if len(row) >= 4:
+                    # Check if column structure splits domain:subdomain across columns
+                    first_col = str(row[0]).strip() if row[0] else ""
+
+                    # If first column has domain prefix but subdomain might be in next column
+                    if ':' in first_col and any(d in first_col for d in ['Adaptive', 'Social', 'Motor', 'Cognitive']):
+                        # Domain:Subdomain might be complete or subdomain continues in col 1
+                        second_col = str(row[1]).strip() if row[1] else ""
+
+                        # Check if second column looks like continuation of subdomain (not a skill)
+                        # Skills typically are longer sentences; subdomain continuations are short
+                        if second_col and len(second_col) < 30 and not any(word in second_col.lower() for word in ['mastered', 'emerging', 'future', 'the ', 'a ', 'an ']):
+                            # Likely subdomain continuation - join it
+                            domain_subdomain = first_col + " " + second_col
+                            skill = str(row[2]).strip() if len(row) > 2 and row[2] else ""
+                            mastery = str(row[3]).strip() if len(row) > 3 and row[3] else ""
+                        else:
+                            domain_subdomain = first_col
+                            skill = second_col
+                            mastery = str(row[2]).strip() if len(row) > 2 and row[2] else ""
+                    else:
+                        domain_subdomain = first_col
+                        skill = str(row[1]).strip() if row[1] else ""
+                        mastery = str(row[2]).strip() if len(row) > 2 and row[2] else ""
+                elif len(row) >= 3:
+                    domain_subdomain = str(row[0]).strip() if row[0] else ""
+                    skill = str(row[1]).strip() if row[1] else ""
+                    mastery = str(row[2]).strip() if row[2] else ""
+                else:
+                    continue
+
+                # Skip header rows
+                if 'DOMAIN' in domain_subdomain.upper() or 'SKILL' in skill.upper():
+                    continue
+
+                parsed = parse_skill_row(domain_subdomain, skill, mastery)
+                if parsed:
+                    rows.append(parsed)
+
+    if seconds is not None:
+        seconds['table'] = time.perf_counter() - start
+    if rows:
+        return rows, 'table'
+
+    # Fall back to text extraction with pipe separator
+    start = time.perf_counter()
+    text = page.extract_text()
+    if text:
+        rows = parse_pipe_text(text)
+
+    if seconds is not None:
+        seconds['text'] = time.perf_counter() - start
+    return rows, 'text' if rows else 'none'
+
+
+# Markers of an Item Level Scores page, matched against the page's
+# characters with whitespace removed
+ITEM_LEVEL_HEADER_RE = re.compile(r'ITEMLEVELSCORES', re.IGNORECASE)
+DOMAIN_MARKER_RE = re.compile(r'(Adaptive|Social-Emotional|Motor|Cognitive):', re.IGNORECASE)
+MASTERY_MARKER_RE = re.compile(r'MASTERED|EMERGING|FUTURE', re.IGNORECASE)
+
+
+def is_item_level_page(page):
+    """Cheaply decide whether a page can contain skill rows.
+
+    Scans the raw characters only, so pages without the "Item Level Scores"
+    header or any domain/mastery markers never reach the table finder.
+    """
+    return is_item_level_text(''.join(char['text'] for char in page.chars))
+
+
+def is_item_level_text(text):
+    """is_item_level_page for a page's text, as read by any backend."""
+    text = ''.join(text.split())
+    if ITEM_LEVEL_HEADER_RE.search(text):
+        return True
+    return bool(DOMAIN_MARKER_RE.search(text) and MASTERY_MARKER_RE.search(text))
+
+
+def scan_page(page, layout=None):
+    """Classify a page and extract its rows if it is an Item Level Scores page.
+
+    layout is the document's column layout for extract_page_rows. Returns
+    (rows, strategy, seconds): rows and strategy like extract_page_rows,
+    with strategy 'skipped' for pages the classifier rejected, and the time
+    spent on each step ('classify', 'columns', 'table', 'text'). The times
+    travel with the result so parse worker processes can report them.
+
+    The page's parsed layout objects are released afterwards, so memory
+    use doesn't grow with the number of pages scanned.
+    """
+    try:
+        start = time.perf_counter()
+        item_level = is_item_level_page(page)
+        seconds = {'classify': time.perf_counter() - start}
+        if not item_level:
+            return [], 'skipped', seconds
+        rows, strategy = extract_page_rows(page, seconds, layout)
+        return rows, strategy, seconds
+    finally:
+        page.close()
+        page.get_textmap.cache_clear()
+
+
+# Characters further apart than this (in points) start a new word, like
+# pdfplumber's default x_tolerance
+WORD_TOLERANCE = 3
+
+# PDFium is not thread-safe: one thread at a time may use it in a process,
+# even on different documents
+pdfium_lock = threading.Lock()
+
+
+def pdfium_words(textpage, text, page_height):
+    """Group a pdfium text page's characters into words like pdfplumber's extract_words.
+
+    text is the page's text, one character per character index. Words
+    break at whitespace, at gaps between characters and between lines, and
+    their positions are converted to pdfplumber's top-down coordinates.
+    """
+    words = []
+    word = None
+    for index, char in enumerate(text):
+        if char.isspace():
+            word = None
+            continue
+
+        left, bottom, right, top = textpage.get_charbox(index, loose=True)
+        top, bottom = page_height - top, page_height - bottom
+        if word is not None and (abs(left - word['x1']) > WORD_TOLERANCE
+                                 or abs(top - word['top']) > LINE_TOLERANCE):
+            word = None
+        if word is None:
+            word = {'chars': [], 'x0': left, 'top': top, 'bottom': bottom}
+            words.append(word)
+        word['chars'].append(char)
+        word['x1'] = right
+        word['bottom'] = max(word['bottom'], bottom)
+
+    for word in words:
+        word['text'] = ''.join(word.pop('chars'))
+        word['height'] = word['bottom'] - word['top']
+    return words
+
+
+def pdfium_vertical_rules(page):
+    """Return the sorted x positions of a pdfium page's vertical rules.
+
+    Thin, tall paths are rules at their centre; larger paths (rectangles)
+    contribute their left and right edges.
+    """
+    import pypdfium2.raw as pdfium_c
+
+    rules = []
+    for path in page.get_objects(filter=[pdfium_c.FPDF_PAGEOBJ_PATH]):
+        left, bottom, right, top = path.get_bounds()
+        if right - left <= 2:
+            if top - bottom > right - left:
+                rules.append((left + right) / 2)
+        elif top - bottom > 2:
+            rules.extend((left, right))
+    return sorted(rules)
+
+
+def scan_pdfium_page(pdf, page_num, layout):
+    """scan_page for the pdfium backend.
+
+    Pages with pipe-separated text are read by parse_pipe_text; others by
+    word position (see column_rows), using the characters' positions from
+    PDFium. There is no table finder, so pages that fit neither give
+    strategy 'none'. The page is loaded and released here, one at a time.
+    """
+    page = pdf[page_num]
+    textpage = page.get_textpage()
+    try:
+        start = time.perf_counter()
+        text = textpage.get_text_range()
+        item_level = is_item_level_text(text)
+        seconds = {'classify': time.perf_counter() - start}
+        if not item_level:
+            return [], 'skipped', seconds
+
+        start = time.perf_counter()
+        if '|' in text:
+            rows = parse_pipe_text(text)
+            seconds['text'] = time.perf_counter() - start
+            return rows, 'text' if rows else 'none', seconds
+
+        rows = None
+        # Characters outside the Basic Multilingual Plane would shift the
+        # text out of step with the character indices
+        if len(text) == textpage.count_chars():
+            lines = group_lines(pdfium_words(textpage, text, page.get_height()))
+            if layout.get('columns') is None:
+                layout['columns'] = find_column_boundaries(lines, lambda: pdfium_vertical_rules(page))
+            if layout['columns'] is not None:
+                rows = column_rows(lines, layout['columns'])
+        seconds['columns'] = time.perf_counter() - start
+        return rows or [], 'columns' if rows else 'none', seconds
+    finally:
+        textpage.close()
+        page.close()
+
+
+def record_page_scans(page_results, backend):
+    """Pass (page_num, scan_page result) pairs through, recording page metrics."""
+    for page_num, result in page_results:
+        rows, strategy, seconds = result
+        increment('bdi3_pages_total', strategy=strategy, backend=backend)
+        for step, elapsed in seconds.items():
+            observe('bdi3_page_step_seconds', elapsed, step=step, backend=backend)
+        yield page_num, result
+
+
+def item_level_section(page_results):
+    """Keep the first contiguous run of Item Level Scores pages that gives rows.
+
+    page_results yields (page_num, scan_page result). A run of pages that
+    mention the section but give no rows, such as a table of contents, is
+    passed over. In serial mode page_results is a generator, so scanning
+    stops at the first skipped page after the section. If no run gives
+    rows, the first run is returned so its strategies are still recorded.
+    """
+    first_run = None
+    section = []
+    has_rows = False
+    for page_num, result in page_results:
+        if result[1] == 'skipped':
+            if has_rows:
+                break
+            if section and first_run is None:
+                first_run = section
+            section = []
+            continue
+        section.append((page_num, result))
+        has_rows = has_rows or bool(result[0])
+    if has_rows:
+        return section
+    return first_run or section
+
+# Worker processes for parsing pages in parallel; 0 or 1 parses serially
+PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', '0'))
+
+# Created on first use so serial deployments never start processes
+parse_executor = None
+
+
+def extract_pages_rows(source, page_numbers, columns=None):
+    """Open a PDF by path or bytes and extract the rows of the given pages.
+
+    Runs in a parse worker process; returns scan_page's result for each
+    page. columns, if given, are the document's column boundaries;
+    otherwise they are looked for on these pages, as in a serial scan.
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    layout = {} if columns is None else {'columns': columns}
+    with open_pdfplumber_document(source) as (page_count, scan):
+        return [scan(page_num, layout) for page_num in page_numbers]
+
+
+def extract_pages_rows_parallel(source, page_numbers, columns=None, columns_page=None):
+    """Split the pages over the parse worker pool and merge results in page order.
+
+    Pages after columns_page are scanned with the column boundaries found
+    on it, columns, so every chunk reads them as the serial parser would.
+    """
+    global parse_executor
+
+    if parse_executor is None:
+        with executor_lock:
+            if parse_executor is None:
+                parse_executor = ProcessPoolExecutor(max_workers=PARSE_WORKERS,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+
+    # One contiguous chunk per worker so each one opens the document once
+    chunk_size = -(-len(page_numbers) // PARSE_WORKERS)
+    chunks = [page_numbers[i:i + chunk_size] for i in range(0, len(page_numbers), chunk_size)]
+    futures = []
+    for chunk in chunks:
+        # A chunk that straddles columns_page is split there
+        split = len(chunk) if columns is None else bisect.bisect_right(chunk, columns_page)
+        for part, part_columns in ((chunk[:split], None), (chunk[split:], columns)):
+            if part:
+                futures.append(parse_executor.submit(extract_pages_rows, source, part, part_columns))
+
+    page_rows = []
+    for future in futures:
+        page_rows.extend(future.result())
+    return page_rows
+
+
+def map_document(file):
+    """Memory-map a document file so pdfminer reads it from the OS page cache.
+
+    Returns an mmap for files with a file descriptor (spooled uploads, job
+    uploads) and file itself for paths and in-memory files.
+    """
+    try:
+        file.flush()
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError):
+        return file
+
+
+@contextlib.contextmanager
+def open_pdfplumber_document(file):
+    """Open a document with pdfplumber; files on disk are memory-mapped.
+
+    Yields (page_count, scan), where scan(page_num, layout) returns
+    scan_page's result for one page.
+    """
+    with contextlib.ExitStack() as stack:
+        mapped = map_document(file)
+        if isinstance(mapped, mmap.mmap):
+            stack.callback(mapped.close)
+        pdf = stack.enter_context(pdfplumber.open(mapped))
+        yield len(pdf.pages), lambda page_num, layout: scan_page(pdf.pages[page_num], layout)
+
+
+@contextlib.contextmanager
+def open_pdfium_document(file):
+    """Open a document with pypdfium2, like open_pdfplumber_document.
+
+    pypdfium2 is imported on first use, as pdfplumber only needs it for
+    rendering. The process's PDFium lock is held until the document is
+    closed.
+    """
+    import pypdfium2
+
+    with pdfium_lock:
+        pdf = pypdfium2.PdfDocument(file)
+        try:
+            yield len(pdf), functools.partial(scan_pdfium_page, pdf)
+        finally:
+            pdf.close()
+
+
+# Openers of the PDF backends, by name
+PDF_BACKENDS = {
+    'pdfplumber': open_pdfplumber_document,
+    'pdfium': open_pdfium_document,
+}
+
+# 'pdfplumber' reads every page with pdfplumber (pdfminer): word
+# positions, then the table finder, then pipe-separated text. 'pdfium'
+# reads word positions and pipe-separated text with PDFium's native text
+# extraction, which is several times faster but has no table finder.
+# 'auto' tries pdfium first and rereads the document with pdfplumber
+# unless every Item Level Scores page gave rows.
+PDF_BACKEND = os.getenv('PDF_BACKEND', 'auto')
+if PDF_BACKEND != 'auto' and PDF_BACKEND not in PDF_BACKENDS:
+    raise ValueError(f'PDF_BACKEND must be auto, {" or ".join(PDF_BACKENDS)}, not {PDF_BACKEND!r}')
+
+
+def find_column_header_page(file, page_numbers):
+    """Return the page a serial scan takes the document's column boundaries from, or None.
+
+    Read with the pdfium backend, which is several times faster than the
+    pdfplumber scan the answer is used for, and stops at that page.
+    Documents pdfium can't read give None.
+    """
+    layout = {}
+    try:
+        with open_pdfium_document(file) as (page_count, scan):
+            for page_num in page_numbers:
+                scan(page_num, layout)
+                if layout.get('columns') is not None:
+                    return page_num
+    except Exception as e:
+        print(f"pdfium could not read the PDF: {e}")
+    return None
+
+
+def scan_document(file, backend, timings=None):
+    """Find and extract the Item Level Scores section with one backend.
+
+    Returns item_level_section's (page_num, scan_page result) pairs.
+    pdfplumber scans pages in the process pool with PARSE_WORKERS > 1;
+    pdfium is fast enough to always scan serially.
+    """
+    with contextlib.ExitStack() as stack:
+        with timed('pdf_open', timings):
+            page_count, scan = stack.enter_context(PDF_BACKENDS[backend](file))
+
+        stack.enter_context(timed('extract', timings))
+        if MAX_PDF_PAGES and page_count > MAX_PDF_PAGES:
+            raise UploadError(f'PDF has {page_count} pages; the limit is {MAX_PDF_PAGES}', 413)
+        page_numbers = list(range(page_count))
+
+        if backend == 'pdfplumber' and PARSE_WORKERS > 1 and page_count > 1:
+            # Workers reopen the document from its path or bytes and scan
+            # every page; the section is picked out afterwards
+            if isinstance(file, str):
+                source = file
+            elif isinstance(getattr(file, 'name', None), str):
+                source = file.name
+            else:
+                file.seek(0)
+                source = file.read()
+
+            # The column boundaries are read here from the page a serial
+            # scan would find them on, and handed to the workers scanning
+            # the pages after it
+            results = {}
+            columns = None
+            columns_page = find_column_header_page(source, page_numbers)
+            if columns_page is not None:
+                layout = {}
+                results[columns_page] = scan(columns_page, layout)
+                columns = layout.get('columns')
+            others = [page_num for page_num in page_numbers if page_num not in results]
+            results.update(zip(others, extract_pages_rows_parallel(source, others, columns, columns_page)))
+            page_results = ((page_num, results[page_num]) for page_num in page_numbers)
+        else:
+            layout = {}
+            page_results = ((page_num, scan(page_num, layout)) for page_num in page_numbers)
+
+        return item_level_section(record_page_scans(page_results, backend))
+
+
+def parse_bdi3_pdf(file, progress=None, match_context=None, timings=None, backend=None):
+    """Parse BDI-3 PDF and extract domain, subdomain, skill, and mastery data.
+
+    file may be a path, bytes or a file object. Documents over
+    MAX_PDF_PAGES pages raise UploadError. The Item Level Scores pages are
+    found by content (see is_item_level_page) rather than by page number,
+    and read with backend, PDF_BACKEND by default (see PDF_BACKENDS). With
+    PARSE_WORKERS > 1, pdfplumber scans the pages in a process pool; the
+    result is the same as the serial parser's. Repeated (domain,
+    subdomain, skill, mastery) rows are kept once. The extraction strategy
+    of each page and the unmatched skills are recorded in match_context, if
+    given. progress, if given, is told when matching starts. The time
+    spent opening, extracting and matching is added to timings, if given.
+    """
     data = {
         "Adaptive": {},
         "Social-Emotional": {},
         "Motor": {},
         "Cognitive": {}
     }
+    # Every skill in extraction order, matched in one batch at the end
+    extracted = []
+
+    if isinstance(file, bytes):
+        file = io.BytesIO(file)
+
+    backend = backend or PDF_BACKEND
+    if backend == 'auto':
+        try:
+            section = scan_document(file, 'pdfium', timings)
+        except UploadError:
+            raise
+        except Exception as e:
+            # Damaged or unusual documents get pdfplumber's own error, if any
+            print(f"pdfium could not read the PDF: {e}")
+            section = None
+        if section and all(result[1] != 'none' for _, result in section):
+            backend = 'pdfium'
+        else:
+            backend = 'pdfplumber'
+            section = scan_document(file, backend, timings)
+    else:
+        section = scan_document(file, backend, timings)
+    increment('bdi3_documents_total', backend=backend)
+
+    seen_rows = set()
+    for page_num, (rows, strategy, _) in section:
+        if match_context is not None:
+            match_context['page_strategies'].append({'page': page_num + 1, 'strategy': strategy})
+
+        for row in rows:
+            if row in seen_rows:
+                continue
+            seen_rows.add(row)
+            domain, subdomain, skill, mastery_status = row
 
-    with pdfplumber.open(file) as pdf:
-        # Pages 4-13 contain Item Level Scores (0-indexed: pages 3-12)
-        for page_num in range(3, min(13, len(pdf.pages))):
-            page = pdf.pages[page_num]
-
-            # Try to extract tables first
-            tables = page.extract_tables()
-
-            if tables:
-                # Process table data
-                for table in tables:
-                    for row in table:
-                        if not row or len(row) < 2:
-                            continue
-
-                        # Handle varying column counts - join first columns if subdomain is split
-                        if len(row) >= 4:
-                            # Check if column structure splits domain:subdomain across columns
-                            first_col = str(row[0]).strip() if row[0] else ""
-
-                            # If first column has domain prefix but subdomain might be in next column
-                            if ':' in first_col and any(d in first_col for d in ['Adaptive', 'Social', 'Motor', 'Cognitive']):
-                                # Domain:Subdomain might be complete or subdomain continues in col 1
-                                second_col = str(row[1]).strip() if row[1] else ""
-
-                                # Check if second column looks like continuation of subdomain (not a skill)
-                                # Skills typically are longer sentences; subdomain continuations are short
-                                if second_col and len(second_col) < 30 and not any(word in second_col.lower() for word in ['mastered', 'emerging', 'future', 'the ', 'a ', 'an ']):
-                                    # Likely subdomain continuation - join it
-                                    domain_subdomain = first_col + " " + second_col
-                                    skill = str(row[2]).strip() if len(row) > 2 and row[2] else ""
-                                    mastery = str(row[3]).strip() if len(row) > 3 and row[3] else ""
-                                else:
-                                    domain_subdomain = first_col
-                                    skill = second_col
-                                    mastery = str(row[2]).strip() if len(row) > 2 and row[2] else ""
-                            else:
-                                domain_subdomain = first_col
-                                skill = str(row[1]).strip() if row[1] else ""
-                                mastery = str(row[2]).strip() if len(row) > 2 and row[2] else ""
-                        elif len(row) >= 3:
-                            domain_subdomain = str(row[0]).strip() if row[0] else ""
-                            skill = str(row[1]).strip() if row[1] else ""
-                            mastery = str(row[2]).strip() if row[2] else ""
-                        else:
-                            continue
-
-                        # Skip header rows
-                        if 'DOMAIN' in domain_subdomain.upper() or 'SKILL' in skill.upper():
-                            continue
-
-                        # Parse domain and subdomain from first column
-                        if ':' in domain_subdomain:
-                            match = re.match(r'(Adaptive|Social-Emotional|Motor|Cognitive):\s*(.+)', domain_subdomain, re.IGNORECASE)
-                            if match:
-                                domain = match.group(1)
-                                # Normalize domain name
-                                if 'adaptive' in domain.lower():
-                                    domain = 'Adaptive'
-                                elif 'social' in domain.lower():
-                                    domain = 'Social-Emotional'
-                                elif 'motor' in domain.lower():
-                                    domain = 'Motor'
-                                elif 'cognitive' in domain.lower():
-                                    domain = 'Cognitive'
-                                else:
-                                    continue
-
-                                subdomain = normalize_subdomain(match.group(2).strip())
-
-                                # Normalize mastery status
-                                mastery_upper = mastery.upper()
-                                if 'MASTERED' in mastery_upper:
-                                    mastery_status = 'MASTERED'
-                                elif 'EMERGING' in mastery_upper:
-                                    mastery_status = 'EMERGING'
-                                elif 'FUTURE' in mastery_upper:
-                                    mastery_status = 'FUTURE LEARNING OBJECTIVE'
-                                else:
-                                    continue  # Skip rows without valid mastery status
-
-                                # Add to data structure
-                                if subdomain not in data[domain]:
-                                    data[domain][subdomain] = []
-
-                                if skill and len(skill) > 3:
-                                    age, match_type = find_age_range(skill)
-                                    data[domain][subdomain].append({
-                                        'skill': skill,
-                                        'mastery': mastery_status,
-                                        'age': age,
-                                        'match_type': match_type
-                                    })
-
-            # Also try text extraction with pipe separator
-            text = page.extract_text()
-            if text:
-                lines = text.split('\n')
-
-                for line in lines:
-                    line = line.strip()
-                    if not line or 'DOMAIN' in line.upper():
-                        continue
-
-                    # Try pipe-separated format: Domain:Subdomain | Skill | Mastery
-                    if '|' in line:
-                        parts = [p.strip() for p in line.split('|')]
-                        if len(parts) >= 3:
-                            domain_subdomain = parts[0]
-                            skill = parts[1]
-                            mastery = parts[2]
-
-                            # Parse domain and subdomain
-                            if ':' in domain_subdomain:
-                                match = re.match(r'(Adaptive|Social-Emotional|Motor|Cognitive):\s*(.+)', domain_subdomain, re.IGNORECASE)
-                                if match:
-                                    domain = match.group(1)
-                                    if 'adaptive' in domain.lower():
-                                        domain = 'Adaptive'
-                                    elif 'social' in domain.lower():
-                                        domain = 'Social-Emotional'
-                                    elif 'motor' in domain.lower():
-                                        domain = 'Motor'
-                                    elif 'cognitive' in domain.lower():
-                                        domain = 'Cognitive'
-                                    else:
-                                        continue
-
-                                    subdomain = normalize_subdomain(match.group(2).strip())
-
-                                    # Normalize mastery status
-                                    mastery_upper = mastery.upper()
-                                    if 'MASTERED' in mastery_upper:
-                                        mastery_status = 'MASTERED'
-                                    elif 'EMERGING' in mastery_upper:
-                                        mastery_status = 'EMERGING'
-                                    elif 'FUTURE' in mastery_upper:
-                                        mastery_status = 'FUTURE LEARNING OBJECTIVE'
-                                    else:
-                                        continue
-
-                                    # Add to data structure
-                                    if subdomain not in data[domain]:
-                                        data[domain][subdomain] = []
-
-                                    if skill and len(skill) > 3:
-                                        age, match_type = find_age_range(skill)
-                                        data[domain][subdomain].append({
-                                            'skill': skill,
-                                            'mastery': mastery_status,
-                                            'age': age,
-                                            'match_type': match_type
-                                        })
+            # Add to data structure
+            if subdomain not in data[domain]:
+                data[domain][subdomain] = []
+
+            if skill and len(skill) > 3:
+                skill_data = {
+                    'skill': skill,
+                    'mastery': mastery_status
+                }
+                data[domain][subdomain].append(skill_data)
+                extracted.append((domain, subdomain, skill_data))
+
+    if progress:
+        progress('stage', {'stage': 'match'})
+
+    with timed('match', timings):
+        match_skills(extracted, match_context)
 
     return data
 
-def generate_html_tables(data, font_size='8', include_summaries=True):
+
+def filter_age_window(data, age_window):
+    """Keep the skills whose age range overlaps age_window, (min_months, max_months).
+
+    Skills with no known age are kept, since they can't be placed, and
+    subdomains left without skills are dropped.
+    """
+    low, high = age_window
+    filtered = {}
+    for domain, subdomains in data.items():
+        filtered[domain] = {}
+        for subdomain, skills in subdomains.items():
+            kept = [
+                skill_data for skill_data in skills
+                if skill_data.get('age_months') is None
+                or (skill_data['age_months'][0] <= high and skill_data['age_months'][1] >= low)
+            ]
+            if kept:
+                filtered[domain][subdomain] = kept
+    return filtered
+
+# Markup of the result tables. The front end's copy buttons depend on it,
+# so it must not change.
+DOMAIN_HEADER_TEMPLATE = (
+    '<div class="domain-section" id="domain_{domain_id}">\n'
+    '  <div class="domain-header">\n'
+    '    <h3 class="domain-title">{domain_name}</h3>\n'
+    '    <button class="copy-btn" data-domain="{domain_id}">Copy Table</button>\n'
+    '  </div>\n'
+    '  <div class="table-container">\n'
+    '  <table class="result-table" style="font-family: Arial, sans-serif; font-size: {font_size}pt;">\n'
+    '    <tbody>\n'
+)
+SUBDOMAIN_HEADER_TEMPLATE = (
+    '      <tr class="subdomain-header-row">\n'
+    '        <td class="age-header">Average age<br>skills develop</td>\n'
+    '        <td class="subdomain-name">{subdomain_name}</td>\n'
+    '        <td class="mastery-header">Mastered</td>\n'
+    '        <td class="mastery-header">Emerging</td>\n'
+    '        <td class="mastery-header">Future<br>Learning<br>Objective</td>\n'
+    '      </tr>\n'
+)
+SKILL_ROW_TEMPLATE = (
+    '      <tr>\n'
+    '        <td class="age-cell">{age}</td>\n'
+    '        <td class="skill-cell">{skill}</td>\n'
+    '        <td class="mastery-cell">{mastered}</td>\n'
+    '        <td class="mastery-cell">{emerging}</td>\n'
+    '        <td class="mastery-cell">{future}</td>\n'
+    '      </tr>\n'
+)
+DOMAIN_TABLE_END = (
+    '    </tbody>\n'
+    '  </table>\n'
+    '  </div>\n'
+)
+DOMAIN_SUMMARY_TEMPLATE = (
+    '  <div class="summaries-section">\n'
+    '    <div class="summary-box" id="summary_{domain_id}">\n'
+    '      <div class="summary-header">\n'
+    '        <span class="summary-subdomain">{domain_name} Summary</span>\n'
+    '        <button class="copy-summary-btn" onclick="copySummary(this)">Copy</button>\n'
+    '      </div>\n'
+    '      <div class="summary-text">{summary_html}</div>\n'
+    '    </div>\n'
+    '  </div>\n'
+)
+DOMAIN_END = '</div>\n'
+
+# X marks for the Mastered | Emerging | Future Learning Objective columns
+MASTERY_MARKS = {
+    'MASTERED': ('X', '', ''),
+    'EMERGING': ('', 'X', ''),
+    'FUTURE LEARNING OBJECTIVE': ('', '', 'X'),
+}
+
+
+def report_domain_names(data):
+    """The domains of a report that have skills, in display order."""
+    return [
+        domain_name for domain_name in ["Adaptive", "Social-Emotional", "Motor", "Cognitive"]
+        if domain_name in data and data[domain_name]
+    ]
+
+
+def subdomain_table_rows(domain_name, subdomain_name, skills):
+    """Order a subdomain's skills for display.
+
+    Returns (age_cell, skill_data) pairs sorted by age range in months,
+    youngest first, where age_cell is blank when the row has the same range
+    as the previous row. Skills with no known age sort last.
+    """
+    rows = []
+    for skill_data in skills:
+        age = skill_data.get('age')
+        age_months = skill_data.get('age_months')
+        # Skills matched by parse_bdi3_pdf already have their age (or none)
+        if not age and 'match_type' not in skill_data:
+            age, _ = find_age_range(skill_data['skill'], domain=domain_name,
+                                    subdomain=subdomain_name)
+        if age and age_months is None:
+            age_months = AGE_RANGES[age] if age in AGE_RANGES else parse_age_range(age)
+
+        if age_months is not None:
+            sort_key = (0, *age_months, '')
+        else:
+            sort_key = (1, 0, 0, age or '')
+        rows.append((sort_key, age or '', skill_data))
+
+    # Sort by age for proper grouping (stable, so ties keep PDF order)
+    rows.sort(key=lambda row: row[0])
+
+    # Track previous age to avoid repeating
+    table_rows = []
+    prev_key = None
+    for sort_key, age, skill_data in rows:
+        table_rows.append((age if sort_key != prev_key else '', skill_data))
+        prev_key = sort_key
+    return table_rows
+
+
+def render_domain_table(domain_name, subdomains, font_size='8'):
+    """Render the opening of a domain section: its header and skills table.
+
+    Returns the markup as a list of chunks, one per subdomain.
+    """
+    domain_id = domain_name.lower().replace('-', '_')
+    chunks = [DOMAIN_HEADER_TEMPLATE.format(domain_id=domain_id, domain_name=domain_name,
+                                            font_size=font_size)]
+
+    # Add each subdomain as rows within the same table
+    for subdomain_name, skills in subdomains.items():
+        if not skills:
+            continue
+
+        parts = [SUBDOMAIN_HEADER_TEMPLATE.format(subdomain_name=subdomain_name)]
+        for age_cell, skill_data in subdomain_table_rows(domain_name, subdomain_name, skills):
+            mastered, emerging, future = MASTERY_MARKS.get(skill_data['mastery'], ('', '', ''))
+            parts.append(SKILL_ROW_TEMPLATE.format(
+                age=age_cell,
+                skill=skill_data['skill'],
+                mastered=mastered,
+                emerging=emerging,
+                future=future
+            ))
+
+        chunks.append(''.join(parts))
+
+    chunks.append(DOMAIN_TABLE_END)
+    return chunks
+
+
+def render_domain_summary(domain_name, summary):
+    """Render the AI summary box that follows a domain's table."""
+    return DOMAIN_SUMMARY_TEMPLATE.format(
+        domain_id=domain_name.lower().replace('-', '_'),
+        domain_name=domain_name,
+        summary_html=summary.replace(chr(10), "<br>")
+    )
+
+
+def iter_html_tables(data, font_size='8', include_summaries=True, progress=None, timings=None):
+    """Yield the HTML of generate_html_tables in chunks, in document order.
+
+    A domain's chunks are yielded as soon as its table is rendered and, with
+    summaries, its summary has arrived, so the response can be streamed.
+    progress, if given, receives each domain's section as soon as its table
+    is rendered and each summary as soon as it arrives. Time spent
+    rendering the tables and waiting for summaries is added to
+    timings['render'] and timings['summary_wait'], if given.
+    """
+    domain_names = report_domain_names(data)
+
+    # Request all AI summaries at once; they run while the tables render
+    pending = start_domain_summaries(data, domain_names) if include_summaries else None
+
+    if progress:
+        progress('stage', {'stage': 'render'})
+
+    render_seconds = 0.0
+
+    def rendered_tables():
+        nonlocal render_seconds
+        for domain_name in domain_names:
+            start = time.perf_counter()
+            chunks = render_domain_table(domain_name, data[domain_name], font_size)
+            render_seconds += time.perf_counter() - start
+            if progress:
+                progress('table', {'domain': domain_name, 'html': ''.join(chunks) + DOMAIN_END})
+            yield domain_name, chunks
+
+    tables = rendered_tables()
+    if pending:
+        # Render every table now so none waits behind an earlier domain's summary
+        tables = list(tables)
+        if progress:
+            progress('stage', {'stage': 'summarise'})
+
+    for index, (domain_name, chunks) in enumerate(tables):
+        if index:
+            yield '\n'
+        yield from chunks
+
+        # Generate AI summary for the entire domain
+        summary = None
+        if pending:
+            with timed('summary_wait', timings):
+                summary = wait_domain_summary(pending, domain_name)
+        if summary:
+            summary_html = render_domain_summary(domain_name, summary)
+            if progress:
+                progress('summary', {'domain': domain_name, 'html': summary_html})
+            yield summary_html
+
+        yield DOMAIN_END
+
+    record_stage('render', render_seconds, timings)
+
+
+def generate_html_tables(data, font_size='8', include_summaries=True, progress=None, timings=None):
     """Generate HTML tables for display on the website.
 
     Output format matches the template:
@@ -482,119 +3210,247 @@ def generate_html_tables(data, font_size='8', include_summaries=True):
     - Column headers: Average age skills develop | [Subdomain] | Mastered | Emerging | Future Learning Objective
     - Data rows: Age | Skill | X | X | X
     - AI-generated summary after each subdomain (if enabled)
+
+    See iter_html_tables for progress and timings.
     """
-    html_output = []
+    return ''.join(iter_html_tables(data, font_size, include_summaries, progress, timings))
 
-    # Process each domain
-    for domain_name in ["Adaptive", "Social-Emotional", "Motor", "Cognitive"]:
-        if domain_name not in data or not data[domain_name]:
-            continue
 
-        # Start wrapper div for this domain
-        domain_id = domain_name.lower().replace('-', '_')
-        domain_html = f'<div class="domain-section" id="domain_{domain_id}">\n'
-        domain_html += f'  <div class="domain-header">\n'
-        domain_html += f'    <h3 class="domain-title">{domain_name}</h3>\n'
-        domain_html += f'    <button class="copy-btn" data-domain="{domain_id}">Copy Table</button>\n'
-        domain_html += f'  </div>\n'
-        domain_html += f'  <div class="table-container">\n'
+def iter_report_events(data, stats, font_size='8', include_summaries=True, cache_key=None):
+    """Yield a parsed report as Server-Sent Events, streaming its AI summaries.
+
+    Every event carries a JSON object:
+    - 'table' ({domain, html}): each domain section without its summary, in order
+    - 'summary_start' ({domain, html}): an empty summary box, when a
+      domain's summary text begins to arrive
+    - 'summary_delta' ({domain, text}): each piece of summary text
+    - 'summary' ({domain, html}): the finished summary box, or
+      'summary_failed' ({domain}) if it failed or timed out
+    - 'done' ({success, stats}): the end of the report
 
-        # Create ONE table for the entire domain with all subdomains
-        domain_html += f'  <table class="result-table" style="font-family: Arial, sans-serif; font-size: {font_size}pt;">\n'
-        domain_html += '    <tbody>\n'
+    Summaries stream concurrently, so their events interleave. With
+    cache_key, a report whose summaries all arrived is stored in the result
+    cache as the events that rebuild it without streaming: its tables,
+    finished summaries and done.
+    """
+    domain_names = report_domain_names(data)
+    # The events a replay from the result cache sends
+    final_events = []
+    complete = True
+
+    # Summary threads send (domain_name, text) as text arrives and
+    # (domain_name, None) when they finish
+    updates = queue.Queue()
+    pending = None
+    if include_summaries:
+        pending = start_domain_summaries(data, domain_names,
+                                         lambda domain_name, text: updates.put((domain_name, text)))
+
+    def event(name, payload):
+        return f'event: {name}\ndata: {json.dumps(payload)}\n\n'
+
+    for domain_name in domain_names:
+        html = ''.join(render_domain_table(domain_name, data[domain_name], font_size)) + DOMAIN_END
+        final_events.append(event('table', {'domain': domain_name, 'html': html}))
+        yield final_events[-1]
+
+    if pending:
+        futures, deadline = pending
+        for domain_name, future in futures.items():
+            future.add_done_callback(functools.partial(lambda domain_name, _: updates.put((domain_name, None)),
+                                                       domain_name))
+
+        started = set()
+        remaining = set(futures)
+        while remaining:
+            try:
+                domain_name, text = updates.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+
+            if text is None:
+                remaining.discard(domain_name)
+                summary = wait_domain_summary(pending, domain_name)
+                if summary:
+                    final_events.append(event('summary', {'domain': domain_name,
+                                                          'html': render_domain_summary(domain_name, summary)}))
+                    yield final_events[-1]
+                else:
+                    complete = False
+                    yield event('summary_failed', {'domain': domain_name})
+                continue
+
+            if domain_name not in started:
+                started.add(domain_name)
+                yield event('summary_start', {'domain': domain_name,
+                                              'html': render_domain_summary(domain_name, '')})
+            yield event('summary_delta', {'domain': domain_name, 'text': text})
+
+        # Summaries still running at the deadline are abandoned
+        for domain_name in remaining:
+            wait_domain_summary(pending, domain_name)
+            complete = False
+            yield event('summary_failed', {'domain': domain_name})
+
+    final_events.append(event('done', {'success': True, 'stats': stats}))
+    yield final_events[-1]
+
+    # Don't cache a report whose summaries failed or timed out
+    if cache_key and complete:
+        cache_put(result_cache, cache_key, ''.join(final_events))
+
+# Word export. The base document comes from DOCX_TEMPLATE_PATH when set,
+# otherwise from python-docx's default template with the report's styles.
+# python-docx is imported by the functions below, so workers that never
+# export a Word document don't load it.
+DOCX_TEMPLATE_PATH = os.getenv('DOCX_TEMPLATE_PATH', '')
+DOCX_TITLE = 'BDI-3 Developmental Assessment Report'
+DOCX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+# Generated documents larger than this are spooled to disk instead of memory
+DOCX_SPOOL_MAX_SIZE = 4 * 1024 * 1024
+
+# <w:t> (qn('w:t')), the element holding a run's text
+DOCX_TEXT_TAG = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t'
+
+# Widths of Average age | Skill | Mastered | Emerging | Future Learning Objective
+DOCX_COLUMN_WIDTHS = (1.1, 3.8, 0.85, 0.85, 0.85)
+DOCX_HEADER_CELLS = ('Average age skills develop', None, 'Mastered', 'Emerging',
+                     'Future Learning Objective')
+
+# The saved base document, and table row prototypes per font size; built
+# once per process and cloned for every export. read_font_size allows
+# only half-point sizes from MIN_FONT_SIZE to MAX_FONT_SIZE, which bounds
+# the number of prototypes.
+docx_template = None
+docx_row_prototypes = {}
+docx_template_lock = threading.Lock()
+
+
+def get_docx_template():
+    """Return the base document as bytes, building it on first use."""
+    global docx_template
+
+    from docx import Document
+    from docx.shared import Inches, Pt
+
+    if docx_template is None:
+        with docx_template_lock:
+            if docx_template is None:
+                if DOCX_TEMPLATE_PATH:
+                    document = Document(DOCX_TEMPLATE_PATH)
+                else:
+                    document = Document()
+                    normal = document.styles['Normal']
+                    normal.font.name = 'Arial'
+                    normal.font.size = Pt(10)
+                    for section in document.sections:
+                        section.left_margin = section.right_margin = Inches(0.5)
+                        section.top_margin = section.bottom_margin = Inches(0.5)
+
+                buffer = io.BytesIO()
+                document.save(buffer)
+                docx_template = buffer.getvalue()
+    return docx_template
+
+
+def get_docx_row_prototypes(font_size):
+    """Return (subdomain header row, skill row) <w:tr> prototypes for a font size.
+
+    Each prototype holds five formatted cells with one text run apiece;
+    exports deep-copy them instead of styling every cell through
+    python-docx.
+    """
+    prototypes = docx_row_prototypes.get(font_size)
+    if prototypes is not None:
+        return prototypes
+
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.shared import Inches, Pt
+
+    document = Document(io.BytesIO(get_docx_template()))
+    table = document.add_table(rows=2, cols=5)
+    for row, bold in zip(table.rows, (True, False)):
+        for column, (cell, width) in enumerate(zip(row.cells, DOCX_COLUMN_WIDTHS)):
+            cell.width = Inches(width)
+            paragraph = cell.paragraphs[0]
+            if column >= 2:
+                paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+            run = paragraph.add_run(' ')
+            run.bold = bold
+            run.font.name = 'Arial'
+            run.font.size = Pt(font_size)
+
+    prototypes = tuple(copy.deepcopy(row._tr) for row in table.rows)
+    with docx_template_lock:
+        docx_row_prototypes[font_size] = prototypes
+    return prototypes
+
+
+def clone_docx_row(prototype, texts):
+    """Copy a prototype row and fill its five cells."""
+    tr = copy.deepcopy(prototype)
+    for t, text in zip(tr.iter(DOCX_TEXT_TAG), texts):
+        t.text = text
+    return tr
+
+
+def build_docx(data, font_size='8', summaries=None):
+    """Build the Word document for a parsed report.
+
+    Mirrors generate_html_tables: one table per domain with a header row per
+    subdomain, skills sorted by age, and each domain's AI summary (from
+    summaries, if given) after its table. Returns the Document.
+    """
+    from docx import Document
+
+    header_row, skill_row = get_docx_row_prototypes(float(font_size))
+    document = Document(io.BytesIO(get_docx_template()))
+    document.add_heading(DOCX_TITLE, level=1)
+
+    for domain_name in report_domain_names(data):
+        document.add_heading(domain_name, level=2)
+        table = document.add_table(rows=0, cols=5)
+        table.style = 'Table Grid'
+        tbl = table._tbl
 
-        # Add each subdomain as rows within the same table
         for subdomain_name, skills in data[domain_name].items():
             if not skills:
                 continue
 
-            # Sort skills by age range for proper grouping
-            skills_with_ages = []
-            for skill_data in skills:
-                # Use existing age if available, otherwise look it up
-                if 'age' in skill_data and skill_data['age']:
-                    age = skill_data['age']
-                else:
-                    age, _ = find_age_range(skill_data['skill'], track_unmatched=False)
-                skills_with_ages.append({**skill_data, 'age': age})
-
-            # Sort by age (using a rough ordering)
-            age_order = ['(0-5mths)', '(0-11mths)', '(0-11 mths)', '(6mths-11mths)',
-                        '(12mths-17mths)', '(12-17mths)', '(12-23mths)', '(12-23 mths)',
-                        '(18mths-2yrs,11mths)', '(18-23 mths)', '(18-23mths)',
-                        '(2 yrs)', '(2-3 yrs)', '(2yrs,6mths-3yrs,11mths)',
-                        '(3 yrs)', '(4 yrs)', '(4-5 yrs)', '(5 yrs)',
-                        '(5-7 yrs)', '(6 yrs)', '(6-7 yrs)', '(7 yrs)', '']
-
-            def age_sort_key(item):
-                age = item.get('age', '')
-                try:
-                    return age_order.index(age)
-                except ValueError:
-                    return len(age_order)
-
-            skills_with_ages.sort(key=age_sort_key)
-
-            # Header row with subdomain name and column titles
-            domain_html += '      <tr class="subdomain-header-row">\n'
-            domain_html += f'        <td class="age-header">Average age<br>skills develop</td>\n'
-            domain_html += f'        <td class="subdomain-name">{subdomain_name}</td>\n'
-            domain_html += '        <td class="mastery-header">Mastered</td>\n'
-            domain_html += '        <td class="mastery-header">Emerging</td>\n'
-            domain_html += '        <td class="mastery-header">Future<br>Learning<br>Objective</td>\n'
-            domain_html += '      </tr>\n'
-
-            # Track previous age to avoid repeating
-            prev_age = None
-
-            # Add skill rows
-            for skill_data in skills_with_ages:
-                domain_html += '      <tr>\n'
-
-                # Age column - only show if different from previous
-                current_age = skill_data.get('age', '')
-                if current_age != prev_age:
-                    domain_html += f'        <td class="age-cell">{current_age}</td>\n'
-                    prev_age = current_age
-                else:
-                    domain_html += '        <td class="age-cell"></td>\n'
+            tbl.append(clone_docx_row(header_row, [
+                subdomain_name if text is None else text for text in DOCX_HEADER_CELLS
+            ]))
+            for age_cell, skill_data in subdomain_table_rows(domain_name, subdomain_name, skills):
+                marks = MASTERY_MARKS.get(skill_data['mastery'], ('', '', ''))
+                tbl.append(clone_docx_row(skill_row, [age_cell, skill_data['skill'], *marks]))
 
-                # Skill column
-                domain_html += f'        <td class="skill-cell">{skill_data["skill"]}</td>\n'
+        summary = (summaries or {}).get(domain_name)
+        if summary:
+            document.add_paragraph().add_run(f'{domain_name} Summary').bold = True
+            for paragraph in summary.split('\n'):
+                if paragraph.strip():
+                    document.add_paragraph(paragraph.strip())
 
-                # Add X mark in appropriate column
-                mastered = 'X' if skill_data['mastery'] == 'MASTERED' else ''
-                emerging = 'X' if skill_data['mastery'] == 'EMERGING' else ''
-                future = 'X' if skill_data['mastery'] == 'FUTURE LEARNING OBJECTIVE' else ''
+    return document
 
-                domain_html += f'        <td class="mastery-cell">{mastered}</td>\n'
-                domain_html += f'        <td class="mastery-cell">{emerging}</td>\n'
-                domain_html += f'        <td class="mastery-cell">{future}</td>\n'
-                domain_html += '      </tr>\n'
 
-        domain_html += '    </tbody>\n'
-        domain_html += '  </table>\n'
-        domain_html += '  </div>\n'
+def send_docx(data, font_size, include_summaries, filename):
+    """Build the report's Word document and send it as a download."""
+    summaries = {}
+    if include_summaries:
+        summaries = collect_domain_summaries(start_domain_summaries(data, report_domain_names(data)))
 
-        # Generate AI summary for the entire domain
-        if include_summaries:
-            summary = generate_domain_summary(domain_name, data[domain_name])
-            if summary:
-                domain_html += '  <div class="summaries-section">\n'
-                domain_html += f'    <div class="summary-box" id="summary_{domain_id}">\n'
-                domain_html += f'      <div class="summary-header">\n'
-                domain_html += f'        <span class="summary-subdomain">{domain_name} Summary</span>\n'
-                domain_html += f'        <button class="copy-summary-btn" onclick="copySummary(this)">Copy</button>\n'
-                domain_html += f'      </div>\n'
-                domain_html += f'      <div class="summary-text">{summary.replace(chr(10), "<br>")}</div>\n'
-                domain_html += f'    </div>\n'
-                domain_html += '  </div>\n'
-
-        domain_html += '</div>\n'
-
-        html_output.append(domain_html)
-
-    return '\n'.join(html_output)
+    document = build_docx(data, font_size, summaries)
+
+    buffer = tempfile.SpooledTemporaryFile(max_size=DOCX_SPOOL_MAX_SIZE)
+    document.save(buffer)
+    buffer.seek(0)
+
+    download_name = os.path.splitext(os.path.basename(filename))[0] + '.docx'
+    return send_file(buffer, mimetype=DOCX_MIMETYPE, as_attachment=True,
+                     download_name=download_name)
 
 if __name__ == '__main__':
     # Use environment variable for port (Replit compatibility)
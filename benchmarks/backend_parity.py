@@ -0,0 +1,119 @@
+"""Check that the PDF backends extract the same rows from the same reports.
+
+Each report is parsed with every backend in app.PDF_BACKENDS and the
+extracted (domain, subdomain, skill, mastery) rows are compared with
+pdfplumber's, in order. With no files, synthetic reports of every layout
+and a few noise levels and seeds are checked:
+
+    python benchmarks/backend_parity.py
+    python benchmarks/backend_parity.py report1.pdf report2.pdf --seeds 5
+
+A report whose pdfium pages don't all give rows is read by pdfplumber in
+PDF_BACKEND=auto mode, so it is listed as a fallback rather than compared.
+Exits with status 1 if any other report's rows differ.
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Set before app is imported, so matching reads nothing learned elsewhere
+os.environ['ALIAS_DB_PATH'] = ''
+sys.path.insert(0, ROOT)
+
+import app  # noqa: E402
+from synthetic_report import generate_report  # noqa: E402
+
+REFERENCE_BACKEND = 'pdfplumber'
+
+SYNTHETIC_LAYOUTS = ('table', 'text', 'mixed')
+SYNTHETIC_NOISE = (0.0, 0.2, 0.5)
+
+# Differing rows printed per report
+MAX_DIFFERENCES = 5
+
+
+def report_rows(data):
+    """The (domain, subdomain, skill, mastery) rows of a parsed report, in order."""
+    return [
+        (domain, subdomain, skill['skill'], skill['mastery'])
+        for domain, subdomains in data.items()
+        for subdomain, skills in subdomains.items()
+        for skill in skills
+    ]
+
+
+def parse_with(document, backend):
+    """Return (rows, page strategies, milliseconds) for one backend."""
+    match_context = app.new_match_context()
+    start = time.perf_counter()
+    data = app.parse_bdi3_pdf(document, match_context=match_context, backend=backend)
+    elapsed = (time.perf_counter() - start) * 1000
+    strategies = [page['strategy'] for page in match_context['page_strategies']]
+    return report_rows(data), strategies, elapsed
+
+
+def synthetic_documents(seeds):
+    for layout in SYNTHETIC_LAYOUTS:
+        for noise in SYNTHETIC_NOISE:
+            for seed in range(seeds):
+                name = f'synthetic layout={layout} noise={noise} seed={seed}'
+                yield name, generate_report(noise=noise, layout=layout, seed=seed)
+
+
+def file_documents(paths):
+    for path in paths:
+        with open(path, 'rb') as f:
+            yield path, f.read()
+
+
+def check_document(name, document):
+    """Print how the backends compare on one report; return False on a mismatch."""
+    results = {backend: parse_with(document, backend) for backend in app.PDF_BACKENDS}
+    reference_rows = results[REFERENCE_BACKEND][0]
+    timings = '  '.join(f'{backend} {elapsed:.0f} ms' for backend, (_, _, elapsed) in results.items())
+    print(f'{name}: {len(reference_rows)} rows  {timings}')
+
+    matched = True
+    for backend, (rows, strategies, _) in results.items():
+        if backend == REFERENCE_BACKEND:
+            continue
+        if not strategies or 'none' in strategies:
+            print(f'  {backend}: fallback (strategies {", ".join(strategies) or "none"})')
+            continue
+        if rows == reference_rows:
+            print(f'  {backend}: same rows')
+            continue
+
+        matched = False
+        differences = [(position, expected, got) for position, (expected, got)
+                       in enumerate(zip(reference_rows, rows)) if expected != got]
+        print(f'  {backend}: DIFFERENT ({len(rows)} rows, {len(differences)} differ in the common part)')
+        for position, expected, got in differences[:MAX_DIFFERENCES]:
+            print(f'    row {position}: {REFERENCE_BACKEND} {expected!r}')
+            print(f'    {" " * len(f"row {position}:")} {backend} {got!r}')
+    return matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the rows extracted by each PDF backend.')
+    parser.add_argument('pdf', nargs='*', help='reports to check; synthetic reports if none')
+    parser.add_argument('--seeds', type=int, default=3, help='synthetic reports per layout and noise level')
+    parser.add_argument('--synthetic', action='store_true', help='also check synthetic reports with files')
+    args = parser.parse_args()
+
+    documents = file_documents(args.pdf) if args.pdf else iter(())
+    if args.synthetic or not args.pdf:
+        documents = (*documents, *synthetic_documents(args.seeds))
+
+    mismatches = [name for name, document in documents if not check_document(name, document)]
+    if mismatches:
+        print(f'{len(mismatches)} report(s) differ between backends')
+        sys.exit(1)
+    print('All backends agree')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""A local stand-in for the Anthropic Messages API, for load testing.
+
+Serves POST /v1/messages, both plain and streamed ("stream": true, as
+Server-Sent Events in the API's format), with summaries written by
+fake_anthropic.fake_summary. Point the app at it with
+
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8099 ANTHROPIC_API_KEY=fake
+
+so summaries go through the real anthropic client and HTTP stack without
+spending API credit. Latency, jitter and the error rate are configurable:
+
+    python benchmarks/fake_anthropic_server.py --port 8099 --latency 1.5 --jitter 0.5 --error-rate 0.05
+
+Errors are answered with --error-status (529 "overloaded" by default),
+which the anthropic client retries up to twice, like the real API's.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_anthropic import fake_summary, message_text  # noqa: E402
+
+ERROR_TYPES = {429: 'rate_limit_error', 500: 'api_error', 529: 'overloaded_error'}
+
+
+class FakeAnthropicHandler(BaseHTTPRequestHandler):
+    # Set by serve(): latency, jitter, token_delay, error_rate, error_status,
+    # rng, and counts of the requests served and errors injected
+    config = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_event(self, event, data):
+        chunk = f'event: {event}\ndata: {json.dumps(data)}\n\n'.encode('utf-8')
+        self.wfile.write(b'%x\r\n' % len(chunk) + chunk + b'\r\n')
+        self.wfile.flush()
+
+    def do_POST(self):
+        if self.path.split('?')[0] != '/v1/messages':
+            self.send_json(404, {'type': 'error', 'error': {'type': 'not_found_error', 'message': self.path}})
+            return
+
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        config = self.config
+        with config['lock']:
+            delay = config['latency'] + config['rng'].uniform(0, config['jitter'])
+            failed = config['rng'].random() < config['error_rate']
+            config['requests'] += 1
+            config['errors'] += failed
+
+        time.sleep(delay)
+        if failed:
+            status = config['error_status']
+            self.send_json(status, {'type': 'error', 'error': {
+                'type': ERROR_TYPES.get(status, 'api_error'), 'message': 'Injected by the fake server'}})
+            return
+
+        prompt = message_text(body['messages'])
+        text = fake_summary(prompt)
+        message_id = f'msg_{uuid.uuid4().hex[:24]}'
+        usage = {'input_tokens': len(prompt) // 4, 'output_tokens': len(text) // 4}
+        message = {
+            'id': message_id, 'type': 'message', 'role': 'assistant', 'model': body.get('model'),
+            'content': [{'type': 'text', 'text': text}],
+            'stop_reason': 'end_turn', 'stop_sequence': None, 'usage': usage,
+        }
+
+        if not body.get('stream'):
+            time.sleep(config['token_delay'] * len(text.split()))
+            self.send_json(200, message)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        self.send_event('message_start', {'type': 'message_start', 'message': dict(
+            message, content=[], stop_reason=None, usage=dict(usage, output_tokens=1))})
+        self.send_event('content_block_start', {'type': 'content_block_start', 'index': 0,
+                                                'content_block': {'type': 'text', 'text': ''}})
+        for position, word in enumerate(re.findall(r'\S+\s*', text)):
+            if position:
+                time.sleep(config['token_delay'])
+            self.send_event('content_block_delta', {'type': 'content_block_delta', 'index': 0,
+                                                    'delta': {'type': 'text_delta', 'text': word}})
+        self.send_event('content_block_stop', {'type': 'content_block_stop', 'index': 0})
+        self.send_event('message_delta', {'type': 'message_delta',
+                                          'delta': {'stop_reason': 'end_turn', 'stop_sequence': None},
+                                          'usage': {'output_tokens': usage['output_tokens']}})
+        self.send_event('message_stop', {'type': 'message_stop'})
+        self.wfile.write(b'0\r\n\r\n')
+
+
+def serve(port=0, latency=1.0, jitter=0.5, token_delay=0.02, error_rate=0.0, error_status=529, seed=0):
+    """Start the server on a background thread; returns it.
+
+    server.server_port is its port, and server.config['requests'] and
+    server.config['errors'] count the requests served and errors injected.
+    """
+    config = {
+        'latency': latency, 'jitter': jitter, 'token_delay': token_delay,
+        'error_rate': error_rate, 'error_status': error_status,
+        'rng': random.Random(seed), 'lock': threading.Lock(), 'requests': 0, 'errors': 0,
+    }
+    handler = type('ConfiguredHandler', (FakeAnthropicHandler,), {'config': config})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    server.config = config
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_server_arguments(parser):
+    parser.add_argument('--latency', type=float, default=1.0, help='seconds before the first token')
+    parser.add_argument('--jitter', type=float, default=0.5, help='up to this many extra seconds, at random')
+    parser.add_argument('--token-delay', type=float, default=0.02, help='seconds between streamed words')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests that fail')
+    parser.add_argument('--error-status', type=int, default=529, choices=sorted(ERROR_TYPES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a fake Anthropic Messages API.')
+    parser.add_argument('--port', type=int, default=8099)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = serve(args.port, args.latency, args.jitter, args.token_delay, args.error_rate, args.error_status)
+    print(f'Fake Anthropic API on http://127.0.0.1:{server.server_port}', file=sys.stderr)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
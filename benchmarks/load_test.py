@@ -0,0 +1,356 @@
+"""Load-test /convert under gunicorn with a fake Anthropic API.
+
+Starts fake_anthropic_server.py and the app under gunicorn (configured
+from the command line, so worker classes and pool sizes can be compared),
+points the app's anthropic client at the fake server, and replays a mix of
+reports at a fixed concurrency. Reports throughput, latency percentiles,
+error rate and the gunicorn workers' peak memory:
+
+    # 200 requests, 8 at a time, half of them with AI summaries
+    python benchmarks/load_test.py --requests 200 --concurrency 8 --summaries 0.5
+
+    # Threaded workers, slower API with errors, real reports in the mix
+    python benchmarks/load_test.py --worker-class gthread --workers 2 --threads 8 \\
+        --latency 3 --jitter 2 --error-rate 0.05 --pdf report1.pdf --pdf report2.pdf
+
+Caches are disabled so every request does the work. Worker memory is read
+from /proc, so it is only reported on Linux.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import shlex
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_anthropic_server import add_server_arguments, serve  # noqa: E402
+from synthetic_report import generate_report  # noqa: E402
+
+# Synthetic reports added to the mix: (pages, skills, noise, layout)
+SYNTHETIC_REPORTS = [
+    (10, 271, 0.1, 'mixed'),
+    (10, 271, 0.3, 'table'),
+    (10, 271, 0.1, 'text'),
+    (20, 500, 0.2, 'mixed'),
+]
+
+# Seconds between worker memory samples
+RSS_SAMPLE_INTERVAL = 0.5
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def encode_form(fields, filename, pdf_bytes):
+    """Return (body, content type) of a multipart form upload."""
+    boundary = uuid.uuid4().hex
+    parts = [
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode('utf-8')
+        for name, value in fields.items()
+    ]
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f'Content-Type: application/pdf\r\n\r\n'.encode('utf-8') + pdf_bytes + b'\r\n'
+    )
+    parts.append(f'--{boundary}--\r\n'.encode('utf-8'))
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def load_documents(pdf_paths, synthetic):
+    """The (name, bytes) reports to replay: the given PDFs plus synthetic ones."""
+    documents = []
+    for path in pdf_paths:
+        with open(path, 'rb') as f:
+            documents.append((os.path.basename(path), f.read()))
+    for seed in range(synthetic):
+        pages, skills, noise, layout = SYNTHETIC_REPORTS[seed % len(SYNTHETIC_REPORTS)]
+        documents.append((f'synthetic-{layout}-{seed}.pdf',
+                          generate_report(pages, skills, noise, layout, seed=seed)))
+    return documents
+
+
+def start_gunicorn(port, args, env):
+    command = [
+        sys.executable, '-m', 'gunicorn', 'app:app',
+        '--bind', f'127.0.0.1:{port}',
+        '--worker-class', args.worker_class,
+        '--workers', str(args.workers),
+        '--threads', str(args.threads),
+        '--timeout', '120',
+    ] + shlex.split(args.gunicorn_args)
+    process = subprocess.Popen(command, cwd=ROOT, env=env)
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'gunicorn exited with status {process.returncode}')
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', '/')
+            if connection.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('gunicorn did not start within 60 seconds')
+
+
+def child_pids(parent_pid):
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name can contain spaces; ppid follows its closing parenthesis
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == parent_pid:
+            pids.append(int(entry))
+    return pids
+
+
+def rss_bytes(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def sample_memory(master_pid, stop, peaks):
+    """Record each worker's and all workers' peak RSS in peaks until stop is set."""
+    while not stop.is_set():
+        total = 0
+        for pid in child_pids(master_pid):
+            rss = rss_bytes(pid)
+            if rss is not None:
+                peaks['workers'][pid] = max(peaks['workers'].get(pid, 0), rss)
+                total += rss
+        peaks['total'] = max(peaks['total'], total)
+        peaks['master'] = max(peaks['master'], rss_bytes(master_pid) or 0)
+        stop.wait(RSS_SAMPLE_INTERVAL)
+
+
+def send_request(port, body, content_type, timeout):
+    """POST one conversion; returns (status, seconds to headers, seconds to the end).
+
+    status is 0 when the connection failed.
+    """
+    start = time.perf_counter()
+    try:
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+        connection.request('POST', '/convert', body=body, headers={'Content-Type': content_type})
+        response = connection.getresponse()
+        first_byte = time.perf_counter() - start
+        response.read()
+        connection.close()
+        return response.status, first_byte, time.perf_counter() - start
+    except OSError:
+        elapsed = time.perf_counter() - start
+        return 0, elapsed, elapsed
+
+
+def run_load(port, requests_plan, concurrency, duration, timeout):
+    """Send the planned requests from `concurrency` threads; returns the results and wall time.
+
+    With duration, the plan is repeated until that many seconds have passed.
+    """
+    results = []
+    lock = threading.Lock()
+    position = [0]
+    deadline = time.monotonic() + duration if duration else None
+
+    def worker():
+        while True:
+            with lock:
+                index = position[0]
+                if deadline is None and index >= len(requests_plan):
+                    return
+                if deadline is not None and time.monotonic() >= deadline:
+                    return
+                position[0] += 1
+            kind, name, body, content_type = requests_plan[index % len(requests_plan)]
+            status, first_byte, elapsed = send_request(port, body, content_type, timeout)
+            with lock:
+                results.append({'kind': kind, 'document': name, 'status': status,
+                                'first_byte': first_byte, 'seconds': elapsed})
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - start
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list."""
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, int(round(fraction * len(values))) - 1))]
+
+
+def latency_summary(results, key='seconds'):
+    values = sorted(result[key] for result in results)
+    return {
+        'count': len(values),
+        'p50_ms': round(percentile(values, 0.50) * 1000, 1) if values else None,
+        'p95_ms': round(percentile(values, 0.95) * 1000, 1) if values else None,
+        'p99_ms': round(percentile(values, 0.99) * 1000, 1) if values else None,
+        'max_ms': round(values[-1] * 1000, 1) if values else None,
+    }
+
+
+def summarize(results, wall_seconds, peaks, api_config, args):
+    ok = [result for result in results if result['status'] == 200]
+    statuses = {}
+    for result in results:
+        statuses[str(result['status'])] = statuses.get(str(result['status']), 0) + 1
+
+    return {
+        'config': {
+            'worker_class': args.worker_class, 'workers': args.workers, 'threads': args.threads,
+            'gunicorn_args': args.gunicorn_args, 'concurrency': args.concurrency,
+            'summaries': args.summaries, 'format': args.format, 'latency': args.latency,
+            'jitter': args.jitter, 'token_delay': args.token_delay, 'error_rate': args.error_rate,
+        },
+        'requests': len(results),
+        'seconds': round(wall_seconds, 2),
+        'throughput_rps': round(len(ok) / wall_seconds, 2) if wall_seconds else None,
+        'error_rate': round(1 - len(ok) / len(results), 4) if results else None,
+        'statuses': statuses,
+        'latency': latency_summary(ok),
+        'first_byte': latency_summary(ok, 'first_byte'),
+        'latency_by_kind': {
+            kind: latency_summary([result for result in ok if result['kind'] == kind])
+            for kind in ('tables', 'summaries')
+        },
+        # Failed API calls only show up as missing summaries in the responses
+        'api': {'requests': api_config['requests'], 'errors_injected': api_config['errors']},
+        'rss_mb': {
+            'master': round(peaks['master'] / 2 ** 20, 1),
+            'workers_peak': [round(rss / 2 ** 20, 1) for rss in peaks['workers'].values()],
+            'workers_total_peak': round(peaks['total'] / 2 ** 20, 1),
+        },
+    }
+
+
+def print_summary(summary):
+    print(f"{summary['requests']} requests in {summary['seconds']} s: "
+          f"{summary['throughput_rps']} successful/s, error rate {summary['error_rate']:.1%} "
+          f"{summary['statuses']}")
+    rows = [('all', summary['latency']), ('first byte', summary['first_byte'])]
+    rows += list(summary['latency_by_kind'].items())
+    for label, latency in rows:
+        if latency['count']:
+            print(f"  {label:<12} n={latency['count']:<5} p50 {latency['p50_ms']:>9.1f} ms  "
+                  f"p95 {latency['p95_ms']:>9.1f} ms  p99 {latency['p99_ms']:>9.1f} ms  "
+                  f"max {latency['max_ms']:>9.1f} ms")
+    print(f"  Anthropic API: {summary['api']['requests']} requests, "
+          f"{summary['api']['errors_injected']} failed on purpose")
+    rss = summary['rss_mb']
+    print(f"  RSS: master {rss['master']} MB, workers {rss['workers_peak']} MB "
+          f"(peak total {rss['workers_total_peak']} MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test /convert with a fake Anthropic API.')
+    parser.add_argument('--requests', type=int, default=100, help='requests to send (ignored with --duration)')
+    parser.add_argument('--duration', type=float, help='send requests for this many seconds instead')
+    parser.add_argument('--concurrency', type=int, default=8, help='requests in flight at once')
+    parser.add_argument('--summaries', type=float, default=0.5,
+                        help='fraction of requests with AI summaries (default 0.5)')
+    parser.add_argument('--format', choices=['json', 'html', 'events'], default='json')
+    parser.add_argument('--pdf', action='append', default=[], help='report to include in the mix (repeatable)')
+    parser.add_argument('--synthetic', type=int, default=4, help='synthetic reports to add to the mix')
+    parser.add_argument('--timeout', type=float, default=180, help='client timeout per request in seconds')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the results to this JSON file')
+
+    server_group = parser.add_argument_group('gunicorn')
+    server_group.add_argument('--worker-class', default='gthread')
+    server_group.add_argument('--workers', type=int, default=2)
+    server_group.add_argument('--threads', type=int, default=8)
+    server_group.add_argument('--gunicorn-args', default='', help='extra gunicorn arguments, quoted')
+
+    add_server_arguments(parser.add_argument_group('fake Anthropic API'))
+    args = parser.parse_args()
+
+    documents = load_documents(args.pdf, args.synthetic)
+    if not documents:
+        parser.error('nothing to send: give --pdf or --synthetic')
+
+    # Every document with and without summaries, shuffled in the requested ratio
+    rng = random.Random(args.seed)
+    plan = []
+    count = args.requests if not args.duration else max(100, len(documents) * 10)
+    for index in range(count):
+        name, pdf_bytes = documents[index % len(documents)]
+        summaries = rng.random() < args.summaries
+        body, content_type = encode_form(
+            {'include_summaries': 'true' if summaries else 'false', 'format': args.format},
+            name, pdf_bytes)
+        plan.append(('summaries' if summaries else 'tables', name, body, content_type))
+    rng.shuffle(plan)
+
+    api = serve(0, args.latency, args.jitter, args.token_delay, args.error_rate, args.error_status, args.seed)
+    state_dir = tempfile.mkdtemp(prefix='bdi3_load_test_')
+    port = free_port()
+    env = dict(
+        os.environ,
+        ANTHROPIC_BASE_URL=f'http://127.0.0.1:{api.server_port}',
+        ANTHROPIC_API_KEY='load-test',
+        SUMMARY_CLIENT='anthropic',
+        SUMMARY_CACHE_PATH='',
+        RESULT_CACHE_PATH='',
+        ALIAS_DB_PATH=os.path.join(state_dir, 'aliases.sqlite3'),
+        JOB_DB_PATH=os.path.join(state_dir, 'jobs.sqlite3'),
+        JOB_UPLOAD_DIR=os.path.join(state_dir, 'uploads'),
+    )
+
+    print(f'Starting gunicorn ({args.workers} x {args.worker_class}, {args.threads} threads)...', file=sys.stderr)
+    gunicorn = start_gunicorn(port, args, env)
+    stop = threading.Event()
+    peaks = {'workers': {}, 'total': 0, 'master': 0}
+    sampler = threading.Thread(target=sample_memory, args=(gunicorn.pid, stop, peaks), daemon=True)
+    sampler.start()
+    try:
+        print(f'Sending requests from {len(documents)} reports, {args.concurrency} at a time...',
+              file=sys.stderr)
+        results, wall_seconds = run_load(port, plan, args.concurrency, args.duration, args.timeout)
+    finally:
+        stop.set()
+        sampler.join()
+        gunicorn.terminate()
+        gunicorn.wait(timeout=30)
+        api.shutdown()
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+    summary = summarize(results, wall_seconds, peaks, api.config, args)
+    print_summary(summary)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
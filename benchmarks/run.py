@@ -0,0 +1,292 @@
+"""Time the conversion pipeline on synthetic reports.
+
+Each scenario generates a report with synthetic_report.py and times:
+
+    parse          parse_bdi3_pdf, including matching
+    parse_<name>   parse with each PDF backend of app.PDF_BACKENDS
+    match          match_skills on the extracted rows (one batch)
+    match_per_row  find_age_range on each extracted row, storing its result
+    render         generate_html_tables without AI summaries
+    endpoint       POST /convert through the Flask test client
+
+The startup scenario times a fresh interpreter importing app (what each
+gunicorn worker does without --preload), with and without the prebuilt
+skills index.
+
+Summaries, the result cache and learned aliases are disabled so every run
+does the work.
+Results are written as JSON; a saved result can be used as a baseline:
+
+    python benchmarks/run.py run --output baseline.json
+    python benchmarks/run.py run --compare baseline.json --threshold 0.2
+    python benchmarks/run.py compare baseline.json current.json
+
+compare exits with status 1 if any stage's median is more than threshold
+slower than the baseline's, and run does if match_skills gives any row a
+different result from find_age_range.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Set before app is imported; the pipeline must not be skipped or call out
+os.environ['RESULT_CACHE_PATH'] = ''
+os.environ['ALIAS_DB_PATH'] = ''
+os.environ.pop('ANTHROPIC_API_KEY', None)
+sys.path.insert(0, ROOT)
+
+import app  # noqa: E402
+from synthetic_report import generate_report  # noqa: E402
+
+SCENARIOS = {
+    'typical': {'pages': 10, 'skills': 271, 'noise': 0.1, 'layout': 'mixed'},
+    'noisy': {'pages': 10, 'skills': 271, 'noise': 0.5, 'layout': 'text'},
+    'large': {'pages': 30, 'skills': 800, 'noise': 0.2, 'layout': 'table'},
+}
+
+STARTUP_SCENARIO = 'startup'
+
+# Stage slowdowns smaller than this are treated as noise by compare
+MIN_REGRESSION_MS = 1.0
+
+
+def time_call(func, repeat):
+    """Run func once to warm up, then repeat times; return timings in ms."""
+    func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'min_ms': round(min(timings), 3),
+        'max_ms': round(max(timings), 3),
+        'runs': repeat,
+    }
+
+
+def extracted_rows(data):
+    """The (domain, subdomain, skill_data) rows of a parsed report, unmatched."""
+    return [
+        (domain, subdomain, {'skill': skill['skill'], 'mastery': skill['mastery']})
+        for domain, subdomains in data.items()
+        for subdomain, skills in subdomains.items()
+        for skill in skills
+    ]
+
+
+def run_scenario(config, repeat, seed):
+    pdf_bytes = generate_report(seed=seed, **config)
+    data = app.parse_bdi3_pdf(pdf_bytes, match_context=app.new_match_context())
+    rows = extracted_rows(data)
+    client = app.app.test_client()
+
+    def parse():
+        app.parse_bdi3_pdf(pdf_bytes, match_context=app.new_match_context())
+
+    def parse_with(backend):
+        def parse():
+            app.parse_bdi3_pdf(pdf_bytes, match_context=app.new_match_context(), backend=backend)
+        return parse
+
+    # Both matchers overwrite the same rows' results, so neither is timed
+    # copying them
+    def match():
+        app.match_skills(rows, app.new_match_context())
+
+    def match_per_row():
+        match_context = app.new_match_context()
+        for domain, subdomain, skill_data in rows:
+            skill_data['age'], skill_data['match_type'] = app.find_age_range(
+                skill_data['skill'], match_context, domain, subdomain)
+
+    def render():
+        app.generate_html_tables(data, '8', include_summaries=False)
+
+    def endpoint():
+        response = client.post('/convert', data={
+            'file': (io.BytesIO(pdf_bytes), 'report.pdf'),
+            'include_summaries': 'false',
+        })
+        if response.status_code != 200:
+            raise RuntimeError(f'/convert returned {response.status_code}: {response.get_data(as_text=True)}')
+
+    match_context = app.new_match_context()
+    matched = extracted_rows(data)
+    app.match_skills(matched, match_context)
+    # The batch matcher must give every row the same result as find_age_range
+    mismatches = sum(
+        (skill_data['age'], skill_data['match_type'])
+        != app.find_age_range(skill_data['skill'], None, domain, subdomain)
+        for domain, subdomain, skill_data in matched
+    )
+
+    return {
+        'config': dict(config, seed=seed),
+        'pdf_bytes': len(pdf_bytes),
+        'skills_extracted': len(rows),
+        'unmatched_count': len(match_context['unmatched_skills']),
+        'match_mismatches': mismatches,
+        'stages': {
+            'parse': time_call(parse, repeat),
+            **{f'parse_{backend}': time_call(parse_with(backend), repeat) for backend in app.PDF_BACKENDS},
+            'match': time_call(match, repeat),
+            'match_per_row': time_call(match_per_row, repeat),
+            'render': time_call(render, repeat),
+            'endpoint': time_call(endpoint, repeat),
+        },
+    }
+
+
+def time_startup(repeat):
+    """Time importing app in a fresh interpreter, as a worker does on startup."""
+    # An API key is set, as in production, to include whatever it costs
+    env = dict(os.environ, ANTHROPIC_API_KEY='benchmark')
+    command = [sys.executable, '-c', 'import app']
+
+    def startup(index_path):
+        def run():
+            subprocess.run(command, cwd=ROOT, env=dict(env, SKILLS_INDEX_PATH=index_path), check=True)
+        return run
+
+    # time_call's warm-up run builds the index if it is missing
+    app_index = app.SKILLS_INDEX_PATH or os.path.join(ROOT, 'bdi3_skills.index')
+    return {
+        'config': {},
+        'stages': {
+            'import': time_call(startup(app_index), repeat),
+            'import_without_index': time_call(startup(''), repeat),
+        },
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(scenarios, repeat, seed):
+    results = {
+        'meta': {
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'parse_workers': app.PARSE_WORKERS,
+            'pdf_backend': app.PDF_BACKEND,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        },
+        'scenarios': {},
+    }
+    for name in scenarios:
+        print(f'Running {name}...', file=sys.stderr)
+        if name == STARTUP_SCENARIO:
+            results['scenarios'][name] = time_startup(repeat)
+        else:
+            results['scenarios'][name] = run_scenario(SCENARIOS[name], repeat, seed)
+    return results
+
+
+def print_results(results):
+    for name, scenario in results['scenarios'].items():
+        if name == STARTUP_SCENARIO:
+            print(name)
+        else:
+            print(f"{name}: {scenario['skills_extracted']} skills, "
+                  f"{scenario['unmatched_count']} unmatched, "
+                  f"{scenario['match_mismatches']} batch/per-row mismatches")
+        for stage, timing in scenario['stages'].items():
+            print(f"  {stage:<20} median {timing['median_ms']:>10.2f} ms   "
+                  f"min {timing['min_ms']:>10.2f} ms")
+
+
+def compare_results(baseline, current, threshold):
+    """Print stage medians against the baseline; return the regressed stages."""
+    regressions = []
+    for name, scenario in current['scenarios'].items():
+        baseline_scenario = baseline['scenarios'].get(name)
+        if baseline_scenario is None:
+            continue
+        if baseline_scenario['config'] != scenario['config']:
+            print(f'{name}: scenario changed since the baseline, skipped')
+            continue
+
+        print(name)
+        for stage, timing in scenario['stages'].items():
+            baseline_timing = baseline_scenario['stages'].get(stage)
+            if baseline_timing is None:
+                continue
+            before = baseline_timing['median_ms']
+            after = timing['median_ms']
+            change = (after - before) / before if before else 0.0
+            regressed = change > threshold and after - before > MIN_REGRESSION_MS
+            if regressed:
+                regressions.append((name, stage, before, after))
+            print(f"  {stage:<20} {before:>10.2f} -> {after:>10.2f} ms  {change:+7.1%}"
+                  f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the BDI-3 conversion pipeline.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument('--scenario', action='append',
+                            choices=sorted(SCENARIOS) + [STARTUP_SCENARIO],
+                            help='scenario to run (repeatable; default all)')
+    run_parser.add_argument('--repeat', type=int, default=5, help='timed runs per stage')
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--output', help='write the results to this JSON file')
+    run_parser.add_argument('--compare', metavar='BASELINE', help='compare with a saved result')
+    run_parser.add_argument('--threshold', type=float, default=0.2,
+                            help='allowed slowdown as a fraction (default 0.2)')
+
+    compare_parser = commands.add_parser('compare', help='compare two saved results')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.2,
+                                help='allowed slowdown as a fraction (default 0.2)')
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        scenarios = args.scenario or list(SCENARIOS) + [STARTUP_SCENARIO]
+        results = run_benchmarks(scenarios, args.repeat, args.seed)
+        print_results(results)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
+        if any(scenario.get('match_mismatches') for scenario in results['scenarios'].values()):
+            print('match_skills and find_age_range disagree')
+            sys.exit(1)
+        if not args.compare:
+            return
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            results = json.load(f)
+
+    regressions = compare_results(baseline, results, args.threshold)
+    if regressions:
+        print(f'{len(regressions)} stage(s) regressed by more than {args.threshold:.0%}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
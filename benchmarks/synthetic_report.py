@@ -0,0 +1,265 @@
+"""Generate synthetic BDI-3 Family Report PDFs for benchmarking.
+
+The reports imitate the Item Level Scores section of a real BDI-3 report:
+a few cover pages, then pages of "Domain: Subdomain | Skill | Mastery" rows
+drawn either as ruled tables (found by pdfplumber's table finder) or as
+pipe-separated text lines (the parser's text fallback). Skills come from
+bdi3_skills.json and can be misspelled to exercise fuzzy matching.
+
+The PDF is written directly with the standard Helvetica font, so no PDF
+library is needed.
+
+    python benchmarks/synthetic_report.py report.pdf --pages 20 --skills 500 --noise 0.2
+"""
+import argparse
+import json
+import os
+import random
+
+SKILLS_JSON_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'bdi3_skills.json')
+
+MASTERY_LABELS = ['MASTERED', 'EMERGING', 'FUTURE LEARNING OBJECTIVE']
+
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+MARGIN = 40
+
+# Table layout: column x positions, font size and line height
+TABLE_COLUMNS = (MARGIN, 190, 470, PAGE_WIDTH - MARGIN)
+TABLE_FONT_SIZE = 7
+TABLE_LINE_HEIGHT = 9
+
+# Text layout: one pipe-separated line per row
+TEXT_FONT_SIZE = 6
+TEXT_LINE_HEIGHT = 12
+
+# Rough Helvetica advance width as a fraction of the font size, for wrapping
+AVERAGE_CHAR_WIDTH = 0.5
+
+
+def load_reference_skills(path=SKILLS_JSON_PATH):
+    """Return (domain, subdomain, skill) for every skill in bdi3_skills.json.
+
+    Subdomains are spelled the way reports print them ("and", not "&").
+    """
+    with open(path, 'r') as f:
+        skills_data = json.load(f)
+
+    return [
+        (domain, subdomain.replace('&', 'and'), skill)
+        for domain, subdomains in skills_data.items()
+        for subdomain, skills in subdomains.items()
+        for skill in skills
+    ]
+
+
+def misspell(text, rng, edits=None):
+    """Apply a few random character edits, like OCR or layout noise."""
+    chars = list(text)
+    for _ in range(edits if edits is not None else rng.randint(1, 3)):
+        if not chars:
+            break
+        position = rng.randrange(len(chars))
+        operation = rng.random()
+        if operation < 0.4:
+            chars[position] = rng.choice('abcdefghijklmnopqrstuvwxyz')
+        elif operation < 0.7:
+            del chars[position]
+        else:
+            chars.insert(position, rng.choice('abcdefghijklmnopqrstuvwxyz'))
+    return ''.join(chars)
+
+
+def synthetic_rows(skill_count, noise=0.0, seed=0):
+    """Pick skill_count report rows, misspelling a `noise` fraction of them.
+
+    Reference skills are used once each before any is repeated.
+    """
+    rng = random.Random(seed)
+    reference = load_reference_skills()
+
+    rows = []
+    while len(rows) < skill_count:
+        batch = reference[:]
+        rng.shuffle(batch)
+        rows.extend(batch[:skill_count - len(rows)])
+
+    report_rows = []
+    for domain, subdomain, skill in rows:
+        if rng.random() < noise:
+            skill = misspell(skill, rng)
+        report_rows.append((f'{domain}: {subdomain}', skill, rng.choice(MASTERY_LABELS)))
+    return report_rows
+
+
+def wrap(text, width, font_size):
+    """Split text into lines that fit width points."""
+    max_chars = max(1, int(width / (font_size * AVERAGE_CHAR_WIDTH)))
+    lines = []
+    line = ''
+    for word in text.split():
+        candidate = f'{line} {word}' if line else word
+        if len(candidate) > max_chars and line:
+            lines.append(line)
+            line = word
+        else:
+            line = candidate
+    if line:
+        lines.append(line)
+    return lines or ['']
+
+
+def escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def draw_text(x, y, text, size):
+    return f'BT /F1 {size} Tf {x:.1f} {y:.1f} Td ({escape(text)}) Tj ET\n'
+
+
+def table_row_height(row):
+    widths = [right - left - 4 for left, right in zip(TABLE_COLUMNS, TABLE_COLUMNS[1:])]
+    lines = max(len(wrap(cell, width, TABLE_FONT_SIZE)) for cell, width in zip(row, widths))
+    return lines * TABLE_LINE_HEIGHT + 4
+
+
+def draw_table_page(rows):
+    """Content stream of a ruled table with a header row."""
+    widths = [right - left - 4 for left, right in zip(TABLE_COLUMNS, TABLE_COLUMNS[1:])]
+    content = draw_text(MARGIN, PAGE_HEIGHT - MARGIN, 'Item Level Scores', 10)
+
+    top = PAGE_HEIGHT - MARGIN - 20
+    y = top
+    boundaries = [y]
+    for row in [('DOMAIN: SUBDOMAIN', 'SKILL', 'MASTERY')] + rows:
+        height = table_row_height(row)
+        for cell, left, width in zip(row, TABLE_COLUMNS, widths):
+            for line_number, line in enumerate(wrap(cell, width, TABLE_FONT_SIZE)):
+                content += draw_text(left + 2, y - (line_number + 1) * TABLE_LINE_HEIGHT,
+                                     line, TABLE_FONT_SIZE)
+        y -= height
+        boundaries.append(y)
+
+    for boundary in boundaries:
+        content += f'{TABLE_COLUMNS[0]} {boundary} m {TABLE_COLUMNS[-1]} {boundary} l S\n'
+    for x in TABLE_COLUMNS:
+        content += f'{x} {top} m {x} {y} l S\n'
+    return content
+
+
+def draw_text_page(rows):
+    """Content stream of pipe-separated text lines."""
+    content = draw_text(MARGIN, PAGE_HEIGHT - MARGIN, 'Item Level Scores', 10)
+    y = PAGE_HEIGHT - MARGIN - 20
+    for row in rows:
+        content += draw_text(MARGIN, y, ' | '.join(row), TEXT_FONT_SIZE)
+        y -= TEXT_LINE_HEIGHT
+    return content
+
+
+def paginate(rows, pages, layout):
+    """Split rows over at least `pages` pages, adding pages when rows don't fit.
+
+    Returns a list of (layout, rows) per page; 'mixed' alternates table and
+    text pages.
+    """
+    available = PAGE_HEIGHT - 2 * MARGIN - 40
+    per_page = max(1, -(-len(rows) // max(1, pages)))
+
+    result = []
+    position = 0
+    while position < len(rows) or len(result) < pages:
+        page_layout = layout
+        if layout == 'mixed':
+            page_layout = 'table' if len(result) % 2 == 0 else 'text'
+
+        chunk = []
+        used = 0
+        while position < len(rows) and len(chunk) < per_page:
+            row = rows[position]
+            height = table_row_height(row) if page_layout == 'table' else TEXT_LINE_HEIGHT
+            if chunk and used + height > available:
+                break
+            chunk.append(row)
+            used += height
+            position += 1
+        result.append((page_layout, chunk))
+    return result
+
+
+def build_pdf(page_contents):
+    """Assemble a minimal PDF from one content stream per page."""
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        None,
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+    ]
+    page_ids = []
+    for content in page_contents:
+        stream = content.encode('cp1252', 'replace')
+        objects.append(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        objects.append(
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+            b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>'
+            % (PAGE_WIDTH, PAGE_HEIGHT, len(objects))
+        )
+        page_ids.append(len(objects))
+    objects[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+        b' '.join(b'%d 0 R' % page_id for page_id in page_ids), len(page_ids))
+
+    output = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+
+    xref = len(output)
+    output += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    for offset in offsets:
+        output += b'%010d 00000 n \n' % offset
+    output += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+        len(objects) + 1, xref)
+    return bytes(output)
+
+
+def generate_report(pages=10, skills=271, noise=0.1, layout='mixed', seed=0, cover_pages=3):
+    """Return the bytes of a synthetic BDI-3 report.
+
+    pages is the minimum number of Item Level Scores pages (more are added
+    when the rows don't fit), skills the number of skill rows, noise the
+    fraction of skills with spelling errors and layout one of 'table',
+    'text' or 'mixed'.
+    """
+    rows = synthetic_rows(skills, noise, seed)
+
+    contents = [
+        draw_text(MARGIN, PAGE_HEIGHT - MARGIN, f'BDI-3 Family Report - page {number + 1}', 12)
+        for number in range(cover_pages)
+    ]
+    for page_layout, page_rows in paginate(rows, pages, layout):
+        if page_layout == 'table':
+            contents.append(draw_table_page(page_rows))
+        else:
+            contents.append(draw_text_page(page_rows))
+    contents.append(draw_text(MARGIN, PAGE_HEIGHT - MARGIN, 'Score Summary', 12))
+
+    return build_pdf(contents)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic BDI-3 report PDF.')
+    parser.add_argument('output', help='PDF file to write')
+    parser.add_argument('--pages', type=int, default=10, help='minimum Item Level Scores pages')
+    parser.add_argument('--skills', type=int, default=271, help='number of skill rows')
+    parser.add_argument('--noise', type=float, default=0.1, help='fraction of misspelled skills')
+    parser.add_argument('--layout', choices=['table', 'text', 'mixed'], default='mixed')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with open(args.output, 'wb') as f:
+        f.write(generate_report(args.pages, args.skills, args.noise, args.layout, args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Offline stand-in for the Anthropic client, used with SUMMARY_CLIENT=fake.
+
+It supports the two calls app.py makes, messages.create and
+messages.stream, and writes a short summary from the skills in the prompt
+instead of calling the API. Streamed summaries arrive word by word, with
+delays that imitate a real model:
+
+    FAKE_ANTHROPIC_LATENCY      seconds before the first text (default 0.5)
+    FAKE_ANTHROPIC_TOKEN_DELAY  seconds between words (default 0.02)
+
+This is for development and load testing; it knows nothing about children.
+"""
+import os
+import re
+import time
+from types import SimpleNamespace
+
+FAKE_ANTHROPIC_LATENCY = float(os.getenv('FAKE_ANTHROPIC_LATENCY', '0.5'))
+FAKE_ANTHROPIC_TOKEN_DELAY = float(os.getenv('FAKE_ANTHROPIC_TOKEN_DELAY', '0.02'))
+
+# The prompt's data section lists "MASTERED: a, b, c" and "EMERGING: ..." lines
+SKILL_LINE_PATTERN = re.compile(r'^(MASTERED|EMERGING): (.+)$', re.MULTILINE)
+
+
+def fake_summary(prompt):
+    """A deterministic summary naming a few skills from the prompt."""
+    skills = {'MASTERED': [], 'EMERGING': []}
+    for mastery, listed in SKILL_LINE_PATTERN.findall(prompt):
+        skills[mastery].extend(skill.strip() for skill in listed.split(','))
+
+    paragraphs = []
+    if skills['MASTERED']:
+        paragraphs.append(
+            f"Your child has mastered {len(skills['MASTERED'])} skills in this area, "
+            f"including {', '.join(skills['MASTERED'][:3]).lower()}."
+        )
+    if skills['EMERGING']:
+        paragraphs.append(
+            f"Skills that are starting to develop include "
+            f"{', '.join(skills['EMERGING'][:3]).lower()}. Practising these at home "
+            f"during everyday routines will help them grow."
+        )
+    if not paragraphs:
+        paragraphs.append('No mastered or emerging skills were reported in this area.')
+    return '\n\n'.join(paragraphs)
+
+
+def message_text(messages):
+    return '\n'.join(message['content'] for message in messages if message['role'] == 'user')
+
+
+def fake_message(text, prompt):
+    # Roughly four characters per token, like English text
+    return SimpleNamespace(
+        content=[SimpleNamespace(type='text', text=text)],
+        usage=SimpleNamespace(input_tokens=len(prompt) // 4, output_tokens=len(text) // 4),
+        stop_reason='end_turn',
+    )
+
+
+class FakeMessageStream:
+    """Context manager returned by FakeMessages.stream."""
+
+    def __init__(self, prompt):
+        self.prompt = prompt
+        self.text = fake_summary(prompt)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    @property
+    def text_stream(self):
+        time.sleep(FAKE_ANTHROPIC_LATENCY)
+        # Words keep their trailing whitespace so the pieces join to the text
+        for position, word in enumerate(re.findall(r'\S+\s*', self.text)):
+            if position:
+                time.sleep(FAKE_ANTHROPIC_TOKEN_DELAY)
+            yield word
+
+    def get_final_message(self):
+        return fake_message(self.text, self.prompt)
+
+
+class FakeMessages:
+    def create(self, messages, **kwargs):
+        prompt = message_text(messages)
+        text = fake_summary(prompt)
+        time.sleep(FAKE_ANTHROPIC_LATENCY + FAKE_ANTHROPIC_TOKEN_DELAY * len(text.split()))
+        return fake_message(text, prompt)
+
+    def stream(self, messages, **kwargs):
+        return FakeMessageStream(message_text(messages))
+
+
+class FakeAnthropic:
+    """Implements the part of anthropic.Anthropic that app.py uses."""
+
+    def __init__(self):
+        self.messages = FakeMessages()
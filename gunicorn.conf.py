@@ -0,0 +1,20 @@
+# Gunicorn reads this file from the working directory on startup.
+import gc
+import os
+
+# Import the app once in the master process. Workers are forked from it and
+# share the loaded libraries and skills index copy-on-write instead of each
+# importing them again. Set GUNICORN_PRELOAD=false to import per worker.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+
+def when_ready(server):
+    # Keep the garbage collector away from everything loaded so far, so
+    # collections in the workers don't write to (and copy) shared pages
+    gc.freeze()
+
+# Threaded workers, so one process serves several conversions at once (and
+# admission control has something to admit). GUNICORN_CMD_ARGS or
+# WEB_CONCURRENCY override these.
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '8'))